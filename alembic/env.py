@@ -27,6 +27,15 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+# Search structures are managed by hand in migrations (see
+# app.models.PRODUCTS_SEARCH_DDL); keep autogenerate from dropping them.
+SEARCH_OBJECTS = {"search_vector", "ix_products_search_vector"}
+
+def include_object(object, name, type_, reflected, compare_to):
+    if reflected and compare_to is None and (name in SEARCH_OBJECTS or (name or "").startswith("products_fts")):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -40,6 +49,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -55,7 +65,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
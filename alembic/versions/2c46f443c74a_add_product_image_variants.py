@@ -0,0 +1,24 @@
+"""Add product image variants
+
+Revision ID: 2c46f443c74a
+Revises: eef84603da90
+Create Date: 2026-10-18 14:02:37.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c46f443c74a'
+down_revision = 'eef84603da90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'image_variants')
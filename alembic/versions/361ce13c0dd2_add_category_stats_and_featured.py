@@ -0,0 +1,59 @@
+"""Add category stats and featured products
+
+Revision ID: 361ce13c0dd2
+Revises: 2c46f443c74a
+Create Date: 2026-10-18 15:41:12.093518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '361ce13c0dd2'
+down_revision = '2c46f443c74a'
+branch_labels = None
+depends_on = None
+
+# Keep in step with crud.FEATURED_LIMIT
+FEATURED_LIMIT = 8
+
+
+def upgrade() -> None:
+    op.add_column('categories', sa.Column('product_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('min_price', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('categories', sa.Column('max_price', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.add_column('catalog_state', sa.Column('featured_ids', sa.JSON(), nullable=True))
+    op.create_index(
+        'ix_products_featured_created_at_id', 'products', ['created_at', 'id'], unique=False,
+        postgresql_where=sa.text('is_featured IS true'),
+        sqlite_where=sa.text('is_featured IS 1'),
+    )
+
+    # Backfill from the existing products
+    op.execute(
+        "UPDATE categories SET "
+        "product_count = (SELECT count(*) FROM products WHERE products.category_id = categories.id), "
+        "min_price = (SELECT min(price) FROM products WHERE products.category_id = categories.id), "
+        "max_price = (SELECT max(price) FROM products WHERE products.category_id = categories.id)"
+    )
+    bind = op.get_bind()
+    featured_ids = [
+        row[0] for row in bind.execute(
+            sa.select(sa.column('id'))
+            .select_from(sa.table('products'))
+            .where(sa.column('is_featured').is_(True))
+            .order_by(sa.column('created_at').desc(), sa.column('id').desc())
+            .limit(FEATURED_LIMIT)
+        )
+    ]
+    catalog_state = sa.table('catalog_state', sa.column('id', sa.Integer), sa.column('featured_ids', sa.JSON))
+    op.execute(catalog_state.update().where(catalog_state.c.id == 1).values(featured_ids=featured_ids))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_featured_created_at_id', table_name='products')
+    op.drop_column('catalog_state', 'featured_ids')
+    op.drop_column('categories', 'max_price')
+    op.drop_column('categories', 'min_price')
+    op.drop_column('categories', 'product_count')
@@ -0,0 +1,28 @@
+"""Add catalog keyset indexes
+
+Revision ID: 846954396798
+Revises: cafef4bef839
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '846954396798'
+down_revision = 'cafef4bef839'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'], unique=False)
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+    op.create_index('ix_products_category_id_created_at_id', 'products', ['category_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_category_id_created_at_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
+    op.drop_index('ix_products_created_at_id', table_name='products')
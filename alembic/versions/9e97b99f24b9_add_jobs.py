@@ -0,0 +1,52 @@
+"""Add jobs
+
+Revision ID: 9e97b99f24b9
+Revises: ce9de6026bf8
+Create Date: 2026-10-18 16:52:09.114207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e97b99f24b9'
+down_revision = 'ce9de6026bf8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=200), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    op.create_index(
+        'ix_jobs_queued_run_after_id', 'jobs', ['run_after', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'queued'"),
+        sqlite_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_queued_run_after_id', table_name='jobs')
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
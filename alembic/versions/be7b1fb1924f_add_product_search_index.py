@@ -0,0 +1,63 @@
+"""Add product search index
+
+Revision ID: be7b1fb1924f
+Revises: 846954396798
+Create Date: 2026-10-18 10:41:07.553921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'be7b1fb1924f'
+down_revision = '846954396798'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column: PostgreSQL keeps it in sync on every INSERT/UPDATE
+        op.execute(
+            "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED"
+        )
+        op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    elif dialect == 'sqlite':
+        # External-content FTS5 table kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+            "name, description, content='products', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 0')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+            "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN "
+            "INSERT INTO products_fts(products_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); "
+            "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_products_search_vector', table_name='products')
+        op.drop_column('products', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS products_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_ai")
+        op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,24 @@
+"""Add products category price index
+
+Revision ID: ce9de6026bf8
+Revises: 361ce13c0dd2
+Create Date: 2026-10-18 16:05:27.640391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce9de6026bf8'
+down_revision = '361ce13c0dd2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_category_id_price_id', 'products', ['category_id', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_category_id_price_id', table_name='products')
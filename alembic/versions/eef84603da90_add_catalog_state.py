@@ -0,0 +1,30 @@
+"""Add catalog state
+
+Revision ID: eef84603da90
+Revises: be7b1fb1924f
+Create Date: 2026-10-18 13:26:51.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eef84603da90'
+down_revision = 'be7b1fb1924f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_state (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)")
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_state')
@@ -0,0 +1,197 @@
+"""
+Static asset pipeline: fingerprint files under app/static into app/static/dist,
+write .gz/.br variants and a manifest, and serve them with far-future caching.
+
+Usage (run by build.sh):
+    python -m app.assets
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import stat
+import sys
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIRNAME = "dist"
+DIST_DIR = STATIC_DIR / DIST_DIRNAME
+UPLOADS_DIRNAME = "uploads"
+# Written at run time (this build's output, product images): never fingerprinted
+# and not even walked, since uploads can hold many thousands of files
+RUNTIME_DIRNAMES = {DIST_DIRNAME, UPLOADS_DIRNAME}
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+STATIC_URL = "/static"
+
+FINGERPRINTED_EXTENSIONS = {
+    ".css", ".js", ".map", ".svg", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf", ".json", ".txt",
+}
+# Already-compressed formats gain nothing from gzip/brotli
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".ico", ".ttf", ".otf"}
+# Variants smaller than this are not worth the extra request negotiation
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# (Accept-Encoding token, file suffix), in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# Build
+def _fingerprint(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def _write_variants(path: Path) -> list:
+    data = path.read_bytes()
+    written = []
+    if len(data) < MIN_COMPRESS_SIZE:
+        return written
+
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz_data) < len(data):
+        path.with_name(path.name + ".gz").write_bytes(gz_data)
+        written.append("gz")
+
+    try:
+        import brotli
+    except ImportError:
+        return written
+    br_data = brotli.compress(data, quality=11)
+    if len(br_data) < len(data):
+        path.with_name(path.name + ".br").write_bytes(br_data)
+        written.append("br")
+    return written
+
+
+def _source_files(static_dir: Path):
+    """Files under static_dir, outside the top-level RUNTIME_DIRNAMES"""
+    for root, dirs, files in os.walk(static_dir):
+        if Path(root) == static_dir:
+            dirs[:] = [name for name in dirs if name not in RUNTIME_DIRNAMES]
+        for name in files:
+            yield Path(root) / name
+
+
+def build_assets(static_dir: Path = STATIC_DIR, dist_dir: Path = DIST_DIR) -> dict:
+    """Rebuild dist_dir from static_dir and return the manifest"""
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+    dist_dir.mkdir(parents=True)
+
+    manifest = {}
+    for source in sorted(_source_files(static_dir)):
+        if dist_dir in source.parents:
+            continue
+        if source.suffix.lower() not in FINGERPRINTED_EXTENSIONS:
+            continue
+        relative = source.relative_to(static_dir)
+        hashed = relative.with_name(f"{source.stem}.{_fingerprint(source)}{source.suffix}")
+        target = dist_dir / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+        variants = _write_variants(target) if source.suffix.lower() in COMPRESSIBLE_EXTENSIONS else []
+        manifest[relative.as_posix()] = hashed.as_posix()
+        print(f"  {relative.as_posix()} -> {hashed.as_posix()} {' '.join(variants)}".rstrip())
+
+    (dist_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+# Manifest lookup
+_manifest = None
+_manifest_mtime = None
+
+
+def load_manifest() -> dict:
+    """Return the build manifest, re-reading it whenever the file changes"""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = MANIFEST_PATH.stat().st_mtime
+    except OSError:
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+    if mtime != _manifest_mtime:
+        try:
+            _manifest = json.loads(MANIFEST_PATH.read_text())
+        except (OSError, ValueError):
+            _manifest = {}
+        _manifest_mtime = mtime
+    return _manifest
+
+
+def asset_url(path: str) -> str:
+    """URL of a static asset, fingerprinted when the build manifest knows it"""
+    path = path.lstrip("/")
+    hashed = load_manifest().get(path)
+    if hashed:
+        return f"{STATIC_URL}/{DIST_DIRNAME}/{hashed}"
+    return f"{STATIC_URL}/{path}"
+
+
+# Serving
+def accepted_encodings(scope: Scope) -> set:
+    accepted = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        token, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves fingerprinted files immutably and precompressed.
+
+    Anything under dist/ is content-addressed, so it is sent with a one-year
+    immutable Cache-Control. A .br or .gz sibling is picked by Accept-Encoding
+    so workers never compress assets per request.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        parts = Path(path).parts
+        if not parts or parts[0] != DIST_DIRNAME or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        accepted = accepted_encodings(scope)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path, stat_result=stat_result, method=scope["method"], media_type=media_type
+                )
+                response.headers["Content-Encoding"] = encoding
+                return self._immutable(response)
+
+        return self._immutable(await super().get_response(path, scope))
+
+    @staticmethod
+    def _immutable(response: Response) -> Response:
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def main():
+    print(f"🎨 Building static assets from {STATIC_DIR}")
+    manifest = build_assets()
+    print(f"✅ {len(manifest)} assets written to {DIST_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
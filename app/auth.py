@@ -1,14 +1,26 @@
 import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from dotenv import load_dotenv
 
+from app.hashing import hashing_pool
+
 load_dotenv()
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context. Lower BCRYPT_ROUNDS (min 4) in tests and benchmarks.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+# passlib and jose (which pulls in cryptography) are imported on first use
+# rather than at import time; app.startup imports them ahead of time in the
+# gunicorn master or during lifespan warmup.
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
 
 # JWT Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -16,12 +28,32 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# Async variants run bcrypt on the bounded hashing pool instead of the event
+# loop; they raise HashingOverloaded when its queue is full.
+async def verify_password_async(plain_password, hashed_password):
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await hashing_pool.run(get_password_hash, password)
+
+_dummy_hash = None
+
+async def verify_dummy_password(plain_password):
+    """Spend the same time as a real check when the user does not exist"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await get_password_hash_async("dummy-password")
+    await verify_password_async(plain_password, _dummy_hash)
+    return False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -34,6 +66,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str):
+    from jose import JWTError, jwt
+
     try:
         if SECRET_KEY is None:
             raise ValueError("SECRET_KEY environment variable is not set.")
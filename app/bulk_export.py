@@ -0,0 +1,138 @@
+"""
+Bulk catalog export: stream every product joined with its category as CSV or
+NDJSON / JSON Lines, optionally gzip-compressed.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from sqlalchemy.orm.session import Session
+
+from app.models import Category, Product
+
+# Rows fetched per round trip from the server-side cursor
+DEFAULT_FETCH_SIZE = 1000
+# Output is flushed to the client in chunks of roughly this many bytes
+CHUNK_SIZE = 64 * 1024
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "jsonl": ("application/jsonl", "jsonl"),
+}
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "price",
+    "image_url",
+    "is_featured",
+    "category_id",
+    "category_name",
+    "created_at",
+    "updated_at",
+)
+
+
+def iter_catalog_rows(db: Session, fetch_size: int = DEFAULT_FETCH_SIZE):
+    """Yield plain row tuples in EXPORT_COLUMNS order through a server-side cursor"""
+    query = (
+        db.query(
+            Product.id,
+            Product.name,
+            Product.description,
+            Product.price,
+            Product.image_url,
+            Product.is_featured,
+            Product.category_id,
+            Category.name.label("category_name"),
+            Product.created_at,
+            Product.updated_at,
+        )
+        .join(Category, Product.category_id == Category.id)
+        .order_by(Product.id)
+        .execution_options(stream_results=True)
+        .yield_per(fetch_size)
+    )
+    for row in query:
+        yield tuple(row)
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[bytes]:
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(
+            {column: _json_value(value) for column, value in zip(EXPORT_COLUMNS, row)},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+            size = 0
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a gzip file incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_catalog(session_factory, fmt: str = "csv", compress: bool = False) -> Iterator[bytes]:
+    """Stream the whole catalog as bytes.
+
+    The generator opens its own session and closes it once the last row has
+    been sent, so it can outlive the request handler that created it.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    db = session_factory()
+    try:
+        rows = iter_catalog_rows(db)
+        chunks = iter_csv(rows) if fmt == "csv" else iter_ndjson(rows)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        db.close()
+
+
+def export_filename(fmt: str, compress: bool = False) -> str:
+    filename = f"catalog-{datetime.now().strftime('%Y%m%d')}.{FORMATS[fmt][1]}"
+    return filename + ".gz" if compress else filename
@@ -0,0 +1,329 @@
+"""
+Bulk catalog import: stream CSV or NDJSON product rows into batched upserts.
+
+Usage:
+    python -m app.bulk_import products.csv [--format csv|ndjson] [--batch-size 1000]
+"""
+import argparse
+import codecs
+import csv
+import itertools
+import json
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.sql import func
+from sqlalchemy.orm.session import Session
+
+from app.cache import catalog_cache
+from app.crud import refresh_category_stats, refresh_featured, touch_catalog
+from app.models import Category, Product
+from app.schemas import ProductCreate
+
+DEFAULT_BATCH_SIZE = 1000
+# Keeps a multi-row INSERT under SQLite's 32766 bound-parameter limit
+MAX_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 500
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("csv", "ndjson")
+UPSERT_COLUMNS = ("name", "description", "price", "category_id", "is_featured")
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """Guess the import format from a file name or content type, defaulting to CSV"""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+# Streaming decoders
+def iter_async_chunks(stream) -> Iterator[bytes]:
+    """Pull chunks of an async byte stream from a worker thread started by anyio"""
+    import anyio.from_thread
+
+    while True:
+        try:
+            yield anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+def iter_multipart_file(chunks: Iterable[bytes], content_type: str) -> Iterator[Tuple[Optional[str], bytes]]:
+    """Yield (filename, data) pieces of the first file part of a multipart body as they arrive"""
+    from multipart.multipart import MultipartParser, parse_options_header
+
+    _, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise ValueError("Missing multipart boundary")
+
+    state = {"field": b"", "value": b"", "headers": {}, "current": False, "done": False}
+    pending: List[bytes] = []
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = state["value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["current"] = not state["done"] and b"filename" in disposition
+        if state["current"]:
+            state["filename"] = disposition[b"filename"].decode("utf-8", "replace")
+        state["headers"] = {}
+
+    def on_part_data(data, start, end):
+        if state["current"]:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        if state["current"]:
+            state["current"] = False
+            state["done"] = True
+
+    parser = MultipartParser(boundary, callbacks={
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    for chunk in chunks:
+        parser.write(chunk)
+        for piece in pending:
+            yield state.get("filename"), piece
+        pending.clear()
+    parser.finalize()
+    if "filename" not in state:
+        raise ValueError("No file found in the upload")
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode UTF-8 byte chunks into lines without holding more than one chunk.
+
+    Only LF (or CRLF) ends a line: str.splitlines() would also split on
+    U+2028, form feeds and the like, which exported descriptions may contain.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        # The last piece may be an incomplete line; keep it for the next chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r") + "\n"
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.removesuffix("\r")
+
+
+def iter_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw row) pairs; a raw row is a dict or a parse error message"""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # Empty cells fall back to the schema defaults
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}
+    elif fmt == "ndjson":
+        for line_num, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, f"Invalid JSON: {e}"
+                continue
+            yield line_num, row if isinstance(row, dict) else "Expected a JSON object"
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def iter_batches(rows: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Upserts
+def _upsert_statement(db: Session, values: List[dict]):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Bulk upsert is not supported on {dialect}")
+
+    stmt = insert(Product.__table__).values(values)
+    update = {column: stmt.excluded[column] for column in UPSERT_COLUMNS if column != "name"}
+    update["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["name"], set_=update)
+
+
+class ImportReport:
+    """Running totals for one import, serialisable with to_dict()"""
+
+    def __init__(self):
+        self.rows = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.batches: List[dict] = []
+        self.started = time.perf_counter()
+
+    def add_error(self, line: int, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": message})
+
+    def to_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds else None,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def import_products(db: Session, rows: Iterable[Tuple[int, object]], batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> ImportReport:
+    """Validate rows against ProductCreate and upsert them by name, one transaction per batch"""
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    category_ids = {category_id for (category_id,) in db.query(Category.id)}
+    report = ImportReport()
+
+    try:
+        for number, batch in enumerate(iter_batches(rows, batch_size), start=1):
+            started = time.perf_counter()
+            # Keyed by name: a name repeated inside one batch keeps its last row,
+            # since ON CONFLICT cannot touch the same row twice in a statement
+            values = {}
+            failed = report.failed
+            for line, raw in batch:
+                report.rows += 1
+                if isinstance(raw, str):
+                    report.add_error(line, raw)
+                    continue
+                try:
+                    product = ProductCreate(**raw)
+                except ValidationError as e:
+                    report.add_error(line, e.errors(include_url=False, include_context=False))
+                    continue
+                if product.category_id not in category_ids:
+                    report.add_error(line, f"Category {product.category_id} does not exist")
+                    continue
+                values[product.name] = product.model_dump(include=set(UPSERT_COLUMNS))
+
+            if values:
+                # Categories the upserted products are leaving need their stats refreshed too
+                moved_from = {
+                    category_id
+                    for (category_id,) in db.query(Product.category_id).filter(Product.name.in_(list(values))).distinct()
+                }
+                db.execute(_upsert_statement(db, list(values.values())))
+                refresh_category_stats(db, moved_from | {row["category_id"] for row in values.values()})
+                refresh_featured(db)
+                touch_catalog(db)
+                db.commit()
+                report.upserted += len(values)
+
+            seconds = time.perf_counter() - started
+            stats = {
+                "batch": number,
+                "rows": len(batch),
+                "upserted": len(values),
+                "failed": report.failed - failed,
+                "seconds": round(seconds, 4),
+                "rows_per_second": round(len(batch) / seconds, 1) if seconds else None,
+            }
+            report.batches.append(stats)
+            if on_batch is not None:
+                on_batch(stats)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if report.upserted:
+            catalog_cache.invalidate()
+    return report
+
+
+def import_stream(db: Session, chunks: Iterable[bytes], fmt: str, batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> ImportReport:
+    return import_products(db, iter_rows(iter_lines(chunks), fmt), batch_size=batch_size, on_batch=on_batch)
+
+
+def import_upload(db: Session, chunks: Iterable[bytes], content_type: str, fmt: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE, on_batch=None) -> ImportReport:
+    """Import a request body that is either a multipart upload or a raw CSV/NDJSON stream"""
+    if content_type.startswith("multipart/form-data"):
+        pieces = iter_multipart_file(chunks, content_type)
+        # Peek at the first piece so the file name can pick the format
+        first = next(pieces, None)
+        if first is None:
+            raise ValueError("The uploaded file is empty")
+        fmt = fmt or detect_format(filename=first[0])
+        chunks = itertools.chain([first[1]], (piece for _, piece in pieces))
+    else:
+        fmt = fmt or detect_format(content_type=content_type)
+    return import_stream(db, chunks, fmt, batch_size=batch_size, on_batch=on_batch)
+
+
+def read_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import products from CSV or NDJSON")
+    parser.add_argument("path", help="file to import")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+
+    fmt = args.format or detect_format(args.path)
+    print(f"📦 Importing {args.path} ({fmt}, batches of {args.batch_size})")
+
+    def on_batch(stats):
+        print(f"  batch {stats['batch']}: {stats['upserted']} upserted, {stats['failed']} failed, "
+              f"{stats['rows_per_second']} rows/s")
+
+    db = SessionLocal()
+    try:
+        report = import_stream(db, read_chunks(args.path), fmt, batch_size=args.batch_size, on_batch=on_batch).to_dict()
+    finally:
+        db.close()
+
+    for error in report["errors"]:
+        print(f"  ❌ line {error['line']}: {error['errors']}")
+    print(f"✅ {report['upserted']} products upserted, {report['failed']} rows failed "
+          f"in {report['seconds']}s ({report['rows_per_second']} rows/s)")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
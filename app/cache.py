@@ -0,0 +1,253 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.metrics import CACHE_COALESCED, CACHE_STALE_SERVED
+
+load_dotenv()
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", 1024))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 60))
+# How long past its TTL an entry may still be served while one request
+# refreshes it (stale-while-revalidate)
+CATALOG_CACHE_STALE_TTL = float(os.getenv("CATALOG_CACHE_STALE_TTL", 30))
+# Optional file shared by all gunicorn workers on a host; bumping it tells
+# every worker to drop its local catalog entries.
+CATALOG_CACHE_VERSION_FILE = os.getenv("CATALOG_CACHE_VERSION_FILE")
+
+
+class FileVersionCounter:
+    """Integer version counter stored in a file and shared between processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> int:
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        import fcntl
+
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    version = int(f.read().strip() or 0) + 1
+                except ValueError:
+                    version = 1
+                f.seek(0)
+                f.truncate()
+                f.write(str(version))
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return version
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters.
+
+    The catalog cache keys entries by the shape of the query (endpoint plus
+    its filter, sort, cursor and limit). Cached values must be plain data or
+    Pydantic models, never ORM instances bound to a session.
+
+    get_or_load_async() is single-flight: concurrent misses for one key
+    await the same load instead of each running it. With stale_ttl, an
+    expired entry keeps being served for that long to everyone but the one
+    request refreshing it. invalidate() drops entries outright, so writes
+    are never hidden behind a stale value.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60,
+        shared: Optional[FileVersionCounter] = None,
+        stale_ttl: float = 0,
+        name: str = "cache",
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.name = name
+        # key -> (fresh until, value, servable until)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> future of the load in progress, touched from the event loop only
+        self._inflight: dict = {}
+        self._version = 0
+        self._shared_version = shared.read() if shared else 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+
+    @property
+    def version(self) -> int:
+        """Local version stamp, incremented on every invalidation"""
+        self._sync_shared()
+        return self._version
+
+    def _sync_shared(self):
+        if self.shared is None:
+            return
+        shared_version = self.shared.read()
+        if shared_version != self._shared_version:
+            with self._lock:
+                self._shared_version = shared_version
+                self._entries.clear()
+                self._version += 1
+
+    def _lookup(self, key: Hashable, missing: Any, allow_stale: bool = False) -> Tuple[Any, bool]:
+        """(value or missing, whether the value is past its TTL)"""
+        self._sync_shared()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], False
+            if entry is not None and allow_stale and entry[2] > now:
+                return entry[1], True
+            if entry is not None and entry[2] <= now:
+                del self._entries[key]
+            self.misses += 1
+            return missing, False
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._lookup(key, default)[0]
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None, ttl: Optional[float] = None):
+        with self._lock:
+            # Drop values computed before an invalidation that raced with them
+            if version is not None and version != self._version:
+                return
+            expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires, value, expires + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value for key, calling loader() on a miss"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        version = self._version
+        value = loader()
+        self.set(key, value, version=version, ttl=ttl)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        """Like get_or_load, for a loader that is a coroutine function.
+
+        Only one loader runs per key at a time; other callers wait for its
+        result, or get the stale value if there is one.
+        """
+        missing = object()
+        loop = asyncio.get_running_loop()
+        while True:
+            value, stale = self._lookup(key, missing, allow_stale=True)
+            if value is not missing and not stale:
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is None or inflight.get_loop() is not loop:
+                break
+            if stale:
+                self._count("stale_hits", CACHE_STALE_SERVED)
+                return value
+            self._count("coalesced", CACHE_COALESCED)
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leading request went away mid-load: take over
+                if inflight.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        future = loop.create_future()
+        # Nobody may be waiting for a failed load; do not log it as unretrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            version = self._version
+            value = await loader()
+            self.set(key, value, version=version, ttl=ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _count(self, attribute: str, counter):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+        counter.labels(self.name).inc()
+
+    def delete(self, key: Hashable):
+        """Drop a single entry locally; other workers keep theirs until it expires"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._version += 1
+
+    def invalidate(self):
+        """Drop every entry here and, when configured, in the other workers"""
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+            self.invalidations += 1
+        if self.shared is not None:
+            shared_version = self.shared.bump()
+            with self._lock:
+                self._shared_version = shared_version
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "coalesced": self.coalesced,
+                "stale_hits": self.stale_hits,
+                "version": self._version,
+                "shared": self.shared.path if self.shared else None,
+            }
+
+
+catalog_cache = LRUCache(
+    maxsize=CATALOG_CACHE_SIZE,
+    ttl=CATALOG_CACHE_TTL,
+    stale_ttl=CATALOG_CACHE_STALE_TTL,
+    name="catalog",
+    shared=FileVersionCounter(CATALOG_CACHE_VERSION_FILE) if CATALOG_CACHE_VERSION_FILE else None,
+)
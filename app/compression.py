@@ -0,0 +1,172 @@
+"""
+On-the-fly gzip/brotli compression of dynamic responses: catalog JSON, HTML
+pages, exports and /metrics.
+
+Only text-like content types at least COMPRESSION_MIN_SIZE bytes long are
+compressed. Responses that already have a Content-Encoding are passed
+through untouched; that covers the precompressed /static/dist assets and gzip
+exports. Streaming responses are compressed chunk by chunk and flushed after
+each one, so exports stay incremental.
+"""
+import os
+import zlib
+from typing import Optional
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.assets import DIST_DIRNAME, STATIC_URL, accepted_encodings
+
+load_dotenv()
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Dynamic responses are compressed per request: a low quality keeps brotli
+# faster than gzip -6 while still producing smaller output
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+}
+# Built with precompressed siblings at deploy time (see app/assets.py)
+SKIP_PREFIXES = (f"{STATIC_URL}/{DIST_DIRNAME}/",)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: gzip only
+    brotli = None
+
+
+class GzipStream:
+    def __init__(self):
+        # wbits 31: gzip container
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+# (Accept-Encoding token, stream), in order of preference
+ENCODERS = (("br", BrotliStream), ("gzip", GzipStream)) if brotli is not None else (("gzip", GzipStream),)
+
+
+def choose_encoding(scope: Scope) -> Optional[str]:
+    accepted = accepted_encodings(scope)
+    for encoding, _ in ENCODERS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def is_compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in COMPRESSIBLE_TYPES:
+        return False
+    length = headers.get("content-length")
+    return length is None or int(length) >= COMPRESSION_MIN_SIZE
+
+
+def _echo_weak_etag(scope: Scope, headers: MutableHeaders):
+    """Answer a revalidation of a compressed (weakened) ETag with the same weak ETag"""
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+        if f"W/{etag}" in (tag.strip() for tag in if_none_match.split(",")):
+            headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing eligible responses with brotli or gzip"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "HEAD"
+            or scope["path"].startswith(SKIP_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(scope)
+        start: Optional[Message] = None
+        stream = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it streams
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if stream is not None:
+                more_body = message.get("more_body", False)
+                body = stream.compress(message.get("body", b""), final=not more_body)
+                await send({**message, "body": body})
+                return
+
+            # First body chunk: decide for the whole response
+            headers = MutableHeaders(raw=start["headers"])
+            if start["status"] == 304:
+                _echo_weak_etag(scope, headers)
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not is_compressible(start["status"], headers) or (
+                not more_body and len(body) < COMPRESSION_MIN_SIZE
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None:
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            stream = dict(ENCODERS)[encoding]()
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The compressed bytes are a different representation
+                headers["ETag"] = f"W/{etag}"
+            compressed = stream.compress(body, final=not more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,45 @@
+"""
+Create an admin account, or promote and reactivate an existing one.
+Self-registration through /auth/register only ever creates "user" accounts.
+
+Usage:
+    python -m app.create_admin <username> <email>
+"""
+import argparse
+import getpass
+import sys
+
+from app import crud
+from app.auth import get_password_hash
+from app.database import SessionLocal
+from app.schemas import UserCreate, UserUpdate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or promote an admin user")
+    parser.add_argument("username")
+    parser.add_argument("email")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        user = crud.get_user_by_username(db, args.username)
+        if user is not None:
+            crud.update_user(db, user, UserUpdate(role="admin", is_active=True))
+            print(f"✅ {args.username} is now an active admin")
+            return 0
+
+        password = getpass.getpass("Password: ")
+        if not password or password != getpass.getpass("Repeat password: "):
+            print("❌ Passwords are empty or do not match")
+            return 1
+        user = UserCreate(username=args.username, email=args.email, password=password)
+        crud.create_user(db, user, get_password_hash(password), role="admin")
+        print(f"✅ Admin {args.username} created")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, case, literal, or_, select
+from sqlalchemy.sql import func
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from sqlalchemy.orm.session import Session
+
+from app.cache import catalog_cache
+from app.models import CatalogState, Category, Product, User
+from app.schemas import CategoryCreate, CategoryUpdate, ProductCreate, ProductUpdate, UserCreate, UserUpdate
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Products shown on the homepage, newest first
+FEATURED_LIMIT = 8
+# Upper bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = (Decimal(50), Decimal(100), Decimal(500), Decimal(1000), Decimal(5000))
+
+# Product listing orders: name -> (sort column, descending)
+PRODUCT_SORTS = {
+    "newest": (Product.created_at, True),
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+}
+
+
+# Loader options per response shape. Product.category is a plain lazy
+# relationship, so every query whose rows get serialized picks one of these
+# explicitly: a page of N products must not cost N extra queries.
+# API responses (ProductResponse): the category id and name in the same query
+PRODUCT_WITH_CATEGORY = (joinedload(Product.category).load_only(Category.id, Category.name),)
+# Product cards in the HTML pages: no category, and any other relationship
+# access fails loudly instead of querying
+PRODUCT_CARD = (
+    load_only(
+        Product.id, Product.name, Product.description, Product.price,
+        Product.image_url, Product.image_variants, Product.created_at,
+    ),
+    raiseload("*"),
+)
+
+
+# Cursor helpers
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    """Encode the last row of a page as an opaque keyset cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps([sort, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise ValueError("Cursor does not match the requested sort order")
+    try:
+        if sort == "newest":
+            value = datetime.fromisoformat(value)
+        elif sort in ("price_asc", "price_desc"):
+            value = Decimal(value)
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError("Invalid cursor")
+    return value, last_id
+
+
+def _after(column, id_column, descending: bool, value, last_id: int):
+    """WHERE clause selecting rows strictly after (value, last_id) in the given order"""
+    if descending:
+        return or_(column < value, and_(column == value, id_column < last_id))
+    return or_(column > value, and_(column == value, id_column > last_id))
+
+
+# Row shapes for the catalog API: plain column tuples turned into dicts
+# with the same keys (and order) as CategoryResponse / ProductResponse,
+# then encoded straight to JSON (app/serialization.py) without building ORM
+# objects or validating a model per item. Decimal prices stay exact.
+CATEGORY_ROW_COLUMNS = (
+    Category.id, Category.name, Category.description, Category.created_at,
+    Category.product_count, Category.min_price, Category.max_price,
+)
+PRODUCT_ROW_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price, Product.category_id,
+    Product.is_featured, Product.image_url, Product.image_variants, Product.created_at,
+    Product.updated_at, Category.name.label("category_name"),
+)
+
+
+def category_row_to_dict(row) -> dict:
+    return {
+        "name": row.name,
+        "description": row.description,
+        "id": row.id,
+        "created_at": row.created_at,
+        "product_count": row.product_count,
+        "min_price": row.min_price,
+        "max_price": row.max_price,
+    }
+
+
+def product_row_to_dict(row) -> dict:
+    return {
+        "name": row.name,
+        "description": row.description,
+        "price": row.price,
+        "category_id": row.category_id,
+        "is_featured": row.is_featured,
+        "id": row.id,
+        "category": {"id": row.category_id, "name": row.category_name},
+        "image_url": row.image_url,
+        "image_variants": row.image_variants,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+    }
+
+
+def _page(rows: list, limit: int, sort: str, key: str):
+    """Trim the extra row fetched by a keyset query and build the next cursor from the last one"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, key), last.id)
+    return rows, next_cursor
+
+
+# Category queries
+def _categories_query(db: Session, cursor: Optional[str]):
+    query = db.query(Category)
+    if cursor:
+        name, last_id = decode_cursor(cursor, "name")
+        query = query.filter(_after(Category.name, Category.id, False, name, last_id))
+    return query.order_by(Category.name, Category.id)
+
+
+def get_categories_page(
+    db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[Category], Optional[str]]:
+    """Return one page of categories ordered by name, plus the cursor for the next page"""
+    rows = _categories_query(db, cursor).limit(limit + 1).all()
+    return _page(rows, limit, "name", "name")
+
+
+def get_category_rows_page(
+    db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Tuple[List[dict], Optional[str]]:
+    """get_categories_page() as CategoryResponse-shaped dicts"""
+    rows = _categories_query(db, cursor).with_entities(*CATEGORY_ROW_COLUMNS).limit(limit + 1).all()
+    rows, next_cursor = _page(rows, limit, "name", "name")
+    return [category_row_to_dict(row) for row in rows], next_cursor
+
+
+def get_category(db: Session, category_id: int) -> Optional[Category]:
+    return db.query(Category).filter(Category.id == category_id).first()
+
+
+# Product queries
+def get_product(db: Session, product_id: int, options=PRODUCT_WITH_CATEGORY) -> Optional[Product]:
+    return db.query(Product).options(*options).filter(Product.id == product_id).first()
+
+
+def get_product_row(db: Session, product_id: int) -> Optional[dict]:
+    """get_product() as a ProductResponse-shaped dict"""
+    row = (
+        db.query(Product)
+        .join(Category, Product.category_id == Category.id)
+        .with_entities(*PRODUCT_ROW_COLUMNS)
+        .filter(Product.id == product_id)
+        .first()
+    )
+    return product_row_to_dict(row) if row is not None else None
+
+
+def _price_filter(min_price: Optional[Decimal], max_price: Optional[Decimal]):
+    """min_price <= price < max_price, either bound optional; None without bounds"""
+    conditions = []
+    if min_price is not None:
+        conditions.append(Product.price >= min_price)
+    if max_price is not None:
+        conditions.append(Product.price < max_price)
+    return and_(*conditions) if conditions else None
+
+
+def _products_query(
+    db: Session,
+    category_id: Optional[int],
+    sort: str,
+    cursor: Optional[str],
+    min_price: Optional[Decimal],
+    max_price: Optional[Decimal],
+):
+    if sort not in PRODUCT_SORTS:
+        raise ValueError(f"Unknown sort order: {sort}")
+    column, descending = PRODUCT_SORTS[sort]
+
+    query = db.query(Product)
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    price_filter = _price_filter(min_price, max_price)
+    if price_filter is not None:
+        query = query.filter(price_filter)
+    if column is Product.price:
+        query = query.filter(Product.price.isnot(None))
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        query = query.filter(_after(column, Product.id, descending, value, last_id))
+
+    if descending:
+        return query.order_by(column.desc(), Product.id.desc()), column.key
+    return query.order_by(column.asc(), Product.id.asc()), column.key
+
+
+def get_products_page(
+    db: Session,
+    category_id: Optional[int] = None,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    options=PRODUCT_WITH_CATEGORY,
+) -> Tuple[List[Product], Optional[str]]:
+    """Return one page of products plus the cursor for the next page.
+
+    Pages are seeked on (sort column, id) instead of using OFFSET, so every
+    page costs the same no matter how deep the client has scrolled. Price
+    orders and price filters only list products that have a price.
+    """
+    query, key = _products_query(db, category_id, sort, cursor, min_price, max_price)
+    rows = query.options(*options).limit(limit + 1).all()
+    return _page(rows, limit, sort, key)
+
+
+def get_product_rows_page(
+    db: Session,
+    category_id: Optional[int] = None,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """get_products_page() as ProductResponse-shaped dicts"""
+    query, key = _products_query(db, category_id, sort, cursor, min_price, max_price)
+    rows = (
+        query.join(Category, Product.category_id == Category.id)
+        .with_entities(*PRODUCT_ROW_COLUMNS)
+        .limit(limit + 1)
+        .all()
+    )
+    rows, next_cursor = _page(rows, limit, sort, key)
+    return [product_row_to_dict(row) for row in rows], next_cursor
+
+
+def _facet_counts_query(db: Session, min_price: Optional[Decimal], max_price: Optional[Decimal]):
+    """(category_id, price bucket, in price filter, count) rows.
+
+    The CASE expressions carry bound parameters, so they are labelled in a
+    subquery and the outer query groups by those columns: repeated in GROUP
+    BY, each copy would get its own placeholder ($1 vs $7 with asyncpg) and
+    PostgreSQL would no longer see them as the selected expressions.
+    """
+    bucket = case(
+        (Product.price.is_(None), None),
+        *((Product.price < upper, index) for index, upper in enumerate(PRICE_BUCKETS)),
+        else_=len(PRICE_BUCKETS),
+    )
+    price_filter = _price_filter(min_price, max_price)
+    in_price = case((price_filter, 1), else_=0) if price_filter is not None else literal(1)
+    products = db.query(
+        Product.category_id.label("category_id"), bucket.label("bucket"), in_price.label("in_price")
+    ).subquery()
+    return db.query(products.c.category_id, products.c.bucket, products.c.in_price, func.count()).group_by(
+        products.c.category_id, products.c.bucket, products.c.in_price
+    )
+
+
+def get_product_facets(
+    db: Session,
+    category_id: Optional[int] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+) -> dict:
+    """Product counts per category and per price bucket for a listing filter.
+
+    Each facet counts under every filter but its own, so a client can show
+    how many products picking another category or price band would give.
+    Both come from one GROUP BY over (category_id, price bucket, whether the
+    price filter matches), which the (category_id, price) index answers
+    without touching the table.
+    """
+    rows = _facet_counts_query(db, min_price, max_price).all()
+
+    categories = {}
+    buckets = [0] * (len(PRICE_BUCKETS) + 1)
+    for row_category_id, row_bucket, row_in_price, count in rows:
+        if row_in_price:
+            categories[row_category_id] = categories.get(row_category_id, 0) + count
+        if row_bucket is not None and (category_id is None or row_category_id == category_id):
+            buckets[row_bucket] += count
+
+    bounds = (None,) + PRICE_BUCKETS + (None,)
+    return {
+        "categories": [{"id": id, "count": count} for id, count in sorted(categories.items())],
+        "price_buckets": [
+            {"min": bounds[index] or Decimal(0), "max": bounds[index + 1], "count": count}
+            for index, count in enumerate(buckets)
+        ],
+    }
+
+
+def get_featured_products(db: Session, limit: int = FEATURED_LIMIT, options=PRODUCT_CARD) -> List[Product]:
+    """Featured products, newest first, from the list precomputed by refresh_featured()"""
+    ids = db.query(CatalogState.featured_ids).filter(CatalogState.id == 1).scalar()
+    if ids is None:
+        # Not computed yet (fresh database): read the partial index directly
+        return _featured_query(db).options(*options).limit(limit).all()
+    ids = ids[:limit]
+    products = {product.id: product for product in db.query(Product).options(*options).filter(Product.id.in_(ids))}
+    return [products[id] for id in ids if id in products]
+
+
+def _featured_query(db: Session):
+    return db.query(Product).filter(Product.is_featured.is_(True)).order_by(
+        Product.created_at.desc(), Product.id.desc()
+    )
+
+
+# Catalog writes. Every write bumps the catalog version in its own
+# transaction and invalidates the catalog cache once committed.
+def get_catalog_state(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Return (version, updated_at) of the catalog"""
+    state = db.query(CatalogState.version, CatalogState.updated_at).filter(CatalogState.id == 1).first()
+    return (state.version, state.updated_at) if state else (0, None)
+
+
+def touch_catalog(db: Session):
+    """Bump the catalog version as part of the current transaction"""
+    updated = (
+        db.query(CatalogState)
+        .filter(CatalogState.id == 1)
+        .update(
+            {CatalogState.version: CatalogState.version + 1, CatalogState.updated_at: func.now()},
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.add(CatalogState(id=1, version=1))
+
+
+def refresh_category_stats(db: Session, category_ids):
+    """Recompute product_count and the price range of the given categories.
+
+    Runs in the caller's transaction, after its product changes are flushed,
+    so the denormalized columns commit (or roll back) with them.
+    """
+    category_ids = {id for id in category_ids if id is not None}
+    if not category_ids:
+        return
+    db.flush()
+
+    def aggregate(expression):
+        return select(expression).where(Product.category_id == Category.id).scalar_subquery()
+
+    db.query(Category).filter(Category.id.in_(category_ids)).update(
+        {
+            Category.product_count: aggregate(func.count(Product.id)),
+            Category.min_price: aggregate(func.min(Product.price)),
+            Category.max_price: aggregate(func.max(Product.price)),
+        },
+        synchronize_session=False,
+    )
+
+
+def refresh_featured(db: Session):
+    """Recompute the featured product list as part of the current transaction"""
+    db.flush()
+    ids = [id for (id,) in _featured_query(db).with_entities(Product.id).limit(FEATURED_LIMIT)]
+    db.query(CatalogState).filter(CatalogState.id == 1).update(
+        {CatalogState.featured_ids: ids}, synchronize_session=False
+    )
+
+
+def _product_changed(db: Session, db_product: Product, old_category_id=None, was_featured=False):
+    """Keep the category stats and featured list in step with one product write"""
+    refresh_category_stats(db, {db_product.category_id, old_category_id})
+    if was_featured or db_product.is_featured:
+        refresh_featured(db)
+
+
+def create_category(db: Session, category: CategoryCreate) -> Category:
+    db_category = Category(**category.model_dump())
+    db.add(db_category)
+    touch_catalog(db)
+    db.commit()
+    db.refresh(db_category)
+    catalog_cache.invalidate()
+    return db_category
+
+
+def update_category(db: Session, db_category: Category, changes: CategoryUpdate) -> Category:
+    for field, value in changes.model_dump(exclude_unset=True).items():
+        setattr(db_category, field, value)
+    touch_catalog(db)
+    db.commit()
+    db.refresh(db_category)
+    catalog_cache.invalidate()
+    return db_category
+
+
+def delete_category(db: Session, db_category: Category):
+    db.delete(db_category)
+    touch_catalog(db)
+    db.commit()
+    catalog_cache.invalidate()
+
+
+def create_product(db: Session, product: ProductCreate) -> Product:
+    db_product = Product(**product.model_dump())
+    db.add(db_product)
+    _product_changed(db, db_product)
+    touch_catalog(db)
+    db.commit()
+    db.refresh(db_product)
+    catalog_cache.invalidate()
+    return db_product
+
+
+def update_product(db: Session, db_product: Product, changes: ProductUpdate) -> Product:
+    old_category_id, was_featured = db_product.category_id, db_product.is_featured
+    for field, value in changes.model_dump(exclude_unset=True).items():
+        setattr(db_product, field, value)
+    _product_changed(db, db_product, old_category_id, was_featured)
+    touch_catalog(db)
+    db.commit()
+    db.refresh(db_product)
+    catalog_cache.invalidate()
+    return db_product
+
+
+def set_product_images(db: Session, db_product: Product, urls: dict) -> Product:
+    """Point a product at freshly stored image variants (see app/images.py)"""
+    db_product.image_variants = urls
+    db_product.image_url = urls.get("large") or next(iter(urls.values()), None)
+    touch_catalog(db)
+    db.commit()
+    db.refresh(db_product)
+    catalog_cache.invalidate()
+    return db_product
+
+
+def delete_product(db: Session, db_product: Product):
+    db.delete(db_product)
+    _product_changed(db, db_product)
+    touch_catalog(db)
+    db.commit()
+    catalog_cache.invalidate()
+
+
+# Users
+def get_user(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+
+def create_user(db: Session, user: UserCreate, hashed_password: str, role: str = "user") -> User:
+    db_user = User(username=user.username, email=user.email, hashed_password=hashed_password, role=role)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+def update_user(db: Session, db_user: User, changes: UserUpdate) -> User:
+    for field, value in changes.model_dump(exclude_unset=True).items():
+        setattr(db_user, field, value)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
@@ -1,43 +1,80 @@
 import os
 from sqlalchemy.engine.create import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm.session import sessionmaker
+from sqlalchemy.orm.session import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.dml import UpdateBase
 from dotenv import load_dotenv
 import urllib.parse
 
 load_dotenv()
 
-# Get database URL from environment variables
-DATABASE_URL = os.getenv("DATABASE_URL")
+def normalize_url(url):
+    """Quote special characters in the password of a Render PostgreSQL URL"""
+    if url and url.startswith("postgresql"):
+        try:
+            # Parse and reconstruct URL to handle special characters
+            parsed_url = urllib.parse.urlparse(url)
+            if parsed_url.password:
+                password = urllib.parse.quote(parsed_url.password)
+                # Reconstruct the URL
+                url = f"postgresql://{parsed_url.username}:{password}@{parsed_url.hostname}:{parsed_url.port}{parsed_url.path}"
+                if parsed_url.query:
+                    url += f"?{parsed_url.query}"
+        except Exception as e:
+            print(f"Warning: Could not parse database URL: {e}")
+    return url
 
-# Handle special characters in password for Render PostgreSQL
-if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
-    try:
-        # Parse and reconstruct URL to handle special characters
-        parsed_url = urllib.parse.urlparse(DATABASE_URL)
-        if parsed_url.password:
-            password = urllib.parse.quote(parsed_url.password)
-            # Reconstruct the URL
-            DATABASE_URL = f"postgresql://{parsed_url.username}:{password}@{parsed_url.hostname}:{parsed_url.port}{parsed_url.path}"
-    except Exception as e:
-        print(f"Warning: Could not parse DATABASE_URL: {e}")
+# Get database URLs from environment variables. The optional replica takes
+# catalog reads (see RoutingSession); everything else uses the primary.
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL"))
+DATABASE_REPLICA_URL = normalize_url(os.getenv("DATABASE_REPLICA_URL"))
 
-# Create SQLAlchemy engine with appropriate settings
-engine_args = {}
-if DATABASE_URL and DATABASE_URL.startswith("sqlite"):
-    engine_args["connect_args"] = {"check_same_thread": False}
-else:
-    # PostgreSQL settings for production
-    engine_args.update({
-        "pool_size": 5,
-        "max_overflow": 10,
+# Connection pool profiles. "connections" is the budget of one instance on
+# the database server, shared by its workers (WEB_CONCURRENCY, which gunicorn
+# also reads), and "per_worker" caps what a single worker may hold, so pools
+# shrink as workers are added. DB_MAX_CONNECTIONS overrides the budget.
+POOL_PROFILES = {
+    # Small managed Postgres: few connections, recycled before the idle timeout
+    "free-tier": {"connections": 20, "per_worker": 8, "pool_recycle": 300, "pool_timeout": 10},
+    # 4 workers: 5 + 10 overflow async connections and 1 + 4 sync per worker
+    "standard": {"connections": 80, "per_worker": 20, "pool_recycle": 1800, "pool_timeout": 30},
+    # PgBouncer in transaction mode does the pooling; never hold connections
+    "pgbouncer": {"null_pool": True},
+}
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "standard")
+if DB_POOL_PROFILE not in POOL_PROFILES:
+    print(f"Warning: Unknown DB_POOL_PROFILE {DB_POOL_PROFILE!r}, using 'standard'")
+    DB_POOL_PROFILE = "standard"
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+DB_MAX_CONNECTIONS = os.getenv("DB_MAX_CONNECTIONS")
+# Request handlers go through the async engine; the sync one serves admin
+# writes, imports, exports and scripts
+ASYNC_POOL_SHARE = 0.75
+
+def pool_args(url, share, profile=DB_POOL_PROFILE, workers=WEB_CONCURRENCY):
+    """create_engine() pool arguments for one engine of one worker"""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    settings = POOL_PROFILES[profile]
+    if settings.get("null_pool"):
+        return {"poolclass": NullPool}
+    budget = int(DB_MAX_CONNECTIONS or settings["connections"])
+    connections = max(2, int(min(budget / workers, settings["per_worker"]) * share))
+    pool_size = max(1, connections // 3)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": connections - pool_size,
+        "pool_timeout": settings["pool_timeout"],
+        "pool_recycle": settings["pool_recycle"],
         "pool_pre_ping": True,
-        "pool_recycle": 300,
-    })
+    }
 
+# Create SQLAlchemy engine with appropriate settings
 try:
     if DATABASE_URL:
-        engine = create_engine(DATABASE_URL, **engine_args)
+        engine = create_engine(DATABASE_URL, **pool_args(DATABASE_URL, 1 - ASYNC_POOL_SHARE))
         print(f"✅ Database engine created for: {DATABASE_URL.split('@')[-1]}")
     else:
         raise ValueError("DATABASE_URL is None")
@@ -49,6 +86,90 @@ except Exception as e:
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers: same database and pool settings, but
+# through asyncpg / aiosqlite so queries never block the event loop.
+# Alembic and scripts keep using the sync engine above.
+def get_async_url(url):
+    if url.startswith("postgresql://") or url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+def create_async_engine_for(url):
+    async_url = get_async_url(url)
+    args = pool_args(async_url, ASYNC_POOL_SHARE)
+    if async_url.startswith("postgresql+asyncpg") and args.get("poolclass") is NullPool:
+        # PgBouncer in transaction mode cannot keep prepared statements
+        separator = "&" if "?" in async_url else "?"
+        async_url += f"{separator}prepared_statement_cache_size=0"
+        args["connect_args"] = {"statement_cache_size": 0}
+    return create_async_engine(async_url, **args)
+
+try:
+    async_engine = create_async_engine_for(engine.url.render_as_string(hide_password=False))
+except Exception as e:
+    print(f"❌ Error creating async database engine: {e}")
+    async_engine = None
+
+# Read replica engines; without DATABASE_REPLICA_URL they are the primary ones
+replica_engine = engine
+async_replica_engine = async_engine
+if DATABASE_REPLICA_URL:
+    try:
+        replica_engine = create_engine(DATABASE_REPLICA_URL, **pool_args(DATABASE_REPLICA_URL, 1 - ASYNC_POOL_SHARE))
+        async_replica_engine = create_async_engine_for(DATABASE_REPLICA_URL)
+        print(f"✅ Read replica engine created for: {DATABASE_REPLICA_URL.split('@')[-1]}")
+    except Exception as e:
+        print(f"❌ Error creating read replica engine, reading from the primary: {e}")
+        replica_engine, async_replica_engine = engine, async_engine
+
+# Query timing and pool usage for /metrics
+from app.metrics import instrument_engine
+instrument_engine(engine, "sync")
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine, "async")
+if replica_engine is not engine:
+    instrument_engine(replica_engine, "replica")
+if async_replica_engine is not None and async_replica_engine is not async_engine:
+    instrument_engine(async_replica_engine.sync_engine, "async_replica")
+
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+class RoutingSession(Session):
+    """Session that reads from the replica and writes to the primary.
+
+    Once the session has flushed or executed a write it stays on the
+    primary, so it always reads its own writes.
+    """
+
+    def __init__(self, primary=None, replica=None, **kw):
+        super().__init__(**kw)
+        self.primary = primary
+        self.replica = replica if replica is not None else primary
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["use_primary"] = True
+        if self.info.get("use_primary"):
+            return self.primary
+        return self.replica
+
+# Catalog reads (catalog API, HTML pages, exports)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, primary=engine, replica=replica_engine
+)
+AsyncReadSessionLocal = sessionmaker(
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    primary=async_engine.sync_engine if async_engine is not None else None,
+    replica=async_replica_engine.sync_engine if async_replica_engine is not None else None,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Create Base class
 Base = declarative_base()
 
@@ -60,14 +181,28 @@ def get_db():
     finally:
         db.close()
 
+# Dependency to get an async database session
+async def get_async_db():
+    if async_engine is None:
+        raise RuntimeError("Async database engine is not available")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for read-mostly handlers: reads are served by the replica
+async def get_read_db():
+    if async_engine is None:
+        raise RuntimeError("Async database engine is not available")
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
 # Test database connection
 from sqlalchemy.sql.expression import text
 def test_database_connection():
     try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
+        # A pooled connection, not a new session: see app/health.py for the probes
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         print(f"Database connection error: {e}")
-        return False
\ No newline at end of file
+        return False
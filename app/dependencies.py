@@ -0,0 +1,97 @@
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.session import Session
+
+from app.auth import verify_token
+from app.cache import FileVersionCounter, LRUCache
+from app.database import get_async_db
+from app.schemas import UserResponse
+
+load_dotenv()
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))
+# Optional file shared by the gunicorn workers so a deactivated user is
+# dropped from every worker's cache immediately rather than after the TTL
+USER_CACHE_VERSION_FILE = os.getenv("USER_CACHE_VERSION_FILE")
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+# Verified token payloads, each kept until its own "exp"
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+# Active users by username, refreshed from the database every USER_CACHE_TTL seconds
+user_cache = LRUCache(
+    maxsize=USER_CACHE_SIZE,
+    ttl=USER_CACHE_TTL,
+    shared=FileVersionCounter(USER_CACHE_VERSION_FILE) if USER_CACHE_VERSION_FILE else None,
+)
+
+
+def _credentials_error():
+    return HTTPException(
+        status_code=401,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_token_payload(token: str) -> Optional[dict]:
+    """Return the verified payload of token, decoding it only on the first use"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    ttl = payload.get("exp", 0) - time.time()
+    if ttl > 0:
+        token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def _load_user(db: Session, username: str) -> Optional[UserResponse]:
+    from app import crud
+
+    user = crud.get_user_by_username(db, username)
+    return UserResponse.model_validate(user) if user is not None else None
+
+
+def invalidate_user(username: Optional[str] = None):
+    """Forget cached users after an account change (e.g. is_active toggled)"""
+    if username is not None and user_cache.shared is None:
+        user_cache.delete(username)
+    else:
+        user_cache.invalidate()
+
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> UserResponse:
+    if not token:
+        raise _credentials_error()
+    payload = get_token_payload(token)
+    username = payload.get("sub") if payload else None
+    if not username:
+        raise _credentials_error()
+
+    user = user_cache.get(username)
+    if user is None:
+        version = user_cache.version
+        user = await db.run_sync(_load_user, username)
+        if user is None:
+            raise _credentials_error()
+        user_cache.set(username, user, version=version)
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="Inactive user")
+    return user
+
+
+async def get_current_admin(user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return user
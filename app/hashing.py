@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from app.metrics import HASH_PENDING, HASH_QUEUE_WAIT, HASH_REJECTED, HASH_SECONDS
+
+load_dotenv()
+
+# bcrypt releases the GIL, so a few threads hash in parallel without blocking the event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Hash jobs allowed to wait or run at once before new ones are turned away
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", 32))
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class HashingPool:
+    """Size-bounded thread pool for password hashing with a queue-depth limit.
+
+    Hash latency and queue wait go to the hash_seconds and
+    hash_queue_wait_seconds histograms, summed over workers on /metrics.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+        return self._executor
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, raising HashingOverloaded if the queue is full"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                HASH_REJECTED.inc()
+                raise HashingOverloaded()
+            self.pending += 1
+        HASH_PENDING.inc()
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            HASH_QUEUE_WAIT.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                HASH_SECONDS.observe(time.perf_counter() - started)
+
+        try:
+            future = self.executor.submit(task)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the thread is done with the job, not until the
+        # caller stops waiting: a client that disconnects mid-hash cancels this
+        # coroutine, but not a bcrypt call already running (a job still queued
+        # is cancelled along with it, which releases the slot)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
+        HASH_PENDING.dec()
+
+    def stats(self) -> dict:
+        """Settings and queue of this worker; latency and totals are on /metrics"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hashing_pool = HashingPool()
@@ -0,0 +1,187 @@
+"""
+Liveness and readiness probes.
+
+/health/live only shows that the worker's event loop answers; it touches
+nothing else, so a slow database never gets a healthy worker restarted.
+
+/health/ready checks what serving traffic needs: a database round trip,
+the schema at the Alembic head, and the templates and static files. Those
+checks are cached for HEALTH_CACHE_TTL seconds and run once at a time per
+worker, so frequent platform probes do not take connections from requests.
+Pool usage is read from the pools themselves on every probe, without a
+connection: when a pool is exhausted the probe answers 503 right away, so
+the load balancer stops routing to this worker until it drains.
+"""
+import asyncio
+import functools
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import text
+
+from app.cache import LRUCache
+
+load_dotenv()
+
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", 5))
+HEALTH_DB_TIMEOUT = float(os.getenv("HEALTH_DB_TIMEOUT", 2))
+# Round trips slower than this are reported as slow (still ready)
+HEALTH_DB_SLOW_MS = float(os.getenv("HEALTH_DB_SLOW_MS", 200))
+
+ALEMBIC_DIR = Path(__file__).parent.parent / "alembic"
+# Templates every page render needs
+REQUIRED_TEMPLATES = ("base.html", "index.html", "products.html")
+
+health_cache = LRUCache(maxsize=1, ttl=HEALTH_CACHE_TTL, name="health")
+
+
+def liveness() -> dict:
+    from app.startup import report
+
+    return {
+        "status": "alive",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.perf_counter() - report.started, 1),
+    }
+
+
+# Pools
+def _engines() -> dict:
+    from app.database import async_engine, async_replica_engine, engine, replica_engine
+
+    engines = {"sync": engine, "replica": replica_engine}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    if async_replica_engine is not None:
+        engines["async_replica"] = async_replica_engine.sync_engine
+    # Without a replica its engines are the primary ones: report each pool once
+    unique = {}
+    for name, each in engines.items():
+        if all(each is not other for other in unique.values()):
+            unique[name] = each
+    return unique
+
+
+def pool_usage(pool) -> dict:
+    """Connections checked out against what the pool may open at most"""
+    usage = {"class": type(pool).__name__}
+    if not isinstance(pool, QueuePool):
+        # NullPool (PgBouncer, SQLite) and the like: no limit of ours to hit
+        return usage
+    max_overflow = pool._max_overflow
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    checked_out = pool.checkedout()
+    usage.update({
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+        "exhausted": capacity is not None and checked_out >= capacity,
+    })
+    return usage
+
+
+# Cached checks
+@functools.lru_cache(maxsize=1)
+def migration_heads() -> Tuple[str, ...]:
+    """Head revisions of the migration scripts shipped with this code"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    return tuple(sorted(ScriptDirectory.from_config(config).get_heads()))
+
+
+async def _ping(async_engine, revision: bool = False) -> dict:
+    async with async_engine.connect() as conn:
+        started = time.perf_counter()
+        await conn.execute(text("SELECT 1"))
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        result = {"ok": True, "latency_ms": latency_ms, "slow": latency_ms > HEALTH_DB_SLOW_MS}
+        if revision:
+            try:
+                rows = await conn.execute(text("SELECT version_num FROM alembic_version"))
+                result["revision"] = sorted(row[0] for row in rows)
+            except Exception:
+                # Schema built without Alembic (metadata.create_all)
+                result["revision"] = []
+        return result
+
+
+async def _check_database(name: str, async_engine, revision: bool = False) -> dict:
+    if async_engine is None:
+        return {"ok": False, "error": f"{name} async engine is not available"}
+    try:
+        return await asyncio.wait_for(_ping(async_engine, revision), HEALTH_DB_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"no answer within {HEALTH_DB_TIMEOUT}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _check_migrations(current: Optional[list]) -> dict:
+    try:
+        head = list(migration_heads())
+    except Exception as e:
+        return {"ok": False, "error": f"cannot read the migration scripts: {e}"}
+    if current is None:
+        return {"ok": False, "head": head, "current": None, "error": "database unreachable"}
+    return {"ok": sorted(current) == head, "head": head, "current": current}
+
+
+def _check_files() -> dict:
+    from app.assets import STATIC_DIR, load_manifest
+    from app.templating import templates
+
+    missing = []
+    for name in REQUIRED_TEMPLATES:
+        try:
+            templates.env.get_template(name)
+        except Exception:
+            missing.append(name)
+    static = STATIC_DIR.is_dir()
+    return {
+        "ok": static and not missing,
+        "static": "available" if static else "missing",
+        "templates": "available" if not missing else f"missing {', '.join(missing)}",
+        # Without a build the pages fall back to unfingerprinted URLs
+        "fingerprinted_assets": len(load_manifest()),
+    }
+
+
+async def _run_checks() -> dict:
+    from app.database import async_engine, async_replica_engine
+
+    checks = {"database": await _check_database("primary", async_engine, revision=True)}
+    if async_replica_engine is not async_engine:
+        checks["replica"] = await _check_database("replica", async_replica_engine)
+    checks["migrations"] = _check_migrations(checks["database"].pop("revision", None))
+    checks["files"] = _check_files()
+    return {"checks": checks, "checked_at": time.time()}
+
+
+async def readiness() -> Tuple[bool, dict]:
+    """(ready, report) for /health/ready"""
+    pools = {name: pool_usage(each.pool) for name, each in _engines().items()}
+    exhausted = [name for name, usage in pools.items() if usage.get("exhausted")]
+    if exhausted:
+        # Asking for a connection now would only join the queue
+        return False, {
+            "status": "unavailable",
+            "reason": f"connection pool exhausted: {', '.join(exhausted)}",
+            "pools": pools,
+        }
+
+    result = await health_cache.get_or_load_async("ready", _run_checks)
+    ready = all(check["ok"] for check in result["checks"].values())
+    return ready, {
+        "status": "ready" if ready else "unavailable",
+        "checks": result["checks"],
+        "pools": pools,
+        "age_seconds": round(time.time() - result["checked_at"], 2),
+    }
@@ -0,0 +1,88 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.cache import catalog_cache
+
+load_dotenv()
+
+# How long a worker trusts its copy of the catalog version before re-reading
+# it; writes made by this worker are seen immediately.
+CATALOG_STATE_TTL = float(os.getenv("CATALOG_STATE_TTL", 5))
+
+
+class CatalogState(NamedTuple):
+    version: int
+    updated_at: Optional[datetime]
+
+
+async def get_catalog_state(db: AsyncSession) -> CatalogState:
+    """Current catalog version and modification time, cached for CATALOG_STATE_TTL"""
+    async def load():
+        return CatalogState(*await db.run_sync(crud.get_catalog_state))
+
+    return await catalog_cache.get_or_load_async(("catalog_state",), load, ttl=CATALOG_STATE_TTL)
+
+
+def catalog_etag(request: Request, state: CatalogState) -> str:
+    """Strong ETag for a catalog resource: the catalog version plus the exact URL"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{state.version}|{request.url.path}?{query}".encode()).hexdigest()
+    return f'"{digest[:24]}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        # SQLite hands back naive CURRENT_TIMESTAMP values, which are UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since as RFC 7232 requires"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+        return modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime]) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def apply_validators(response: Response, etag: str, last_modified: Optional[datetime]):
+    response.headers.update(validator_headers(etag, last_modified))
@@ -0,0 +1,211 @@
+"""
+Product image pipeline: stream an upload to disk, render resized WebP
+variants in a process pool and hand them to the configured storage backend.
+
+Storage is picked with IMAGE_STORAGE ("local" or "cloudinary"). It defaults to
+Cloudinary when CLOUDINARY_URL is set and to app/static/uploads otherwise.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import anyio
+from dotenv import load_dotenv
+
+from app.assets import STATIC_DIR, STATIC_URL, UPLOADS_DIRNAME
+
+load_dotenv()
+
+UPLOADS_DIR = STATIC_DIR / UPLOADS_DIRNAME
+UPLOADS_URL = f"{STATIC_URL}/{UPLOADS_DIRNAME}"
+IMAGE_TMP_DIR = os.getenv("IMAGE_TMP_DIR", os.path.join(tempfile.gettempdir(), "biomedis-uploads"))
+IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "cloudinary" if os.getenv("CLOUDINARY_URL") else "local")
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+# Decompression-bomb guard, checked from the header before any pixel is decoded
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 80_000_000))
+# Resizing is CPU bound and holds the GIL, so it runs in separate processes
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 1))
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", 80))
+
+# variant name -> longest side in pixels, largest first
+VARIANTS = {"large": 1600, "medium": 800, "thumb": 320}
+ALLOWED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF", "TIFF", "BMP"}
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageError(ValueError):
+    """The upload is not an image this pipeline accepts"""
+
+
+class ImageTooLarge(ImageError):
+    """The upload is over IMAGE_MAX_UPLOAD_BYTES"""
+
+
+# Upload
+def save_upload(chunks: Iterable[bytes], content_type: str, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> Tuple[Path, str]:
+    """Write a raw or multipart image body to a temporary file.
+
+    Returns the file path and the sha256 of its content. Runs in a worker
+    thread; only one chunk is held in memory at a time.
+    """
+    from app.bulk_import import iter_multipart_file
+
+    if content_type.lower().startswith("multipart/form-data"):
+        chunks = (data for _, data in iter_multipart_file(chunks, content_type))
+
+    os.makedirs(IMAGE_TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, name = tempfile.mkstemp(prefix="upload-", dir=IMAGE_TMP_DIR)
+    path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge(f"Image is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        if size == 0:
+            raise ImageError("Empty upload")
+        probe(path)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
+
+
+def probe(path: Path) -> Tuple[str, int, int]:
+    """Read format and size from the image header without decoding pixels"""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(path) as img:
+            fmt, (width, height) = img.format, img.size
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageError(f"Not a supported image: {e}")
+    if fmt not in ALLOWED_FORMATS:
+        raise ImageError(f"Unsupported image format: {fmt}")
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ImageError(f"Image is too large ({width}x{height})")
+    return fmt, width, height
+
+
+# Variants (run inside the process pool)
+def make_variants(source: str, out_dir: str) -> Dict[str, str]:
+    """Render every VARIANTS size of source as WebP and return {name: path}"""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    largest = max(VARIANTS.values())
+    with Image.open(source) as img:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale straight from the DCT
+        # coefficients, which skips most of the work for huge photos
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+    files = {}
+    # Each size is reduced from the previous one rather than from the original
+    for name, size in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+        img.thumbnail((size, size), Image.LANCZOS, reducing_gap=3.0)
+        target = os.path.join(out_dir, f"{name}.webp")
+        img.save(target, "WEBP", quality=WEBP_QUALITY, method=4)
+        files[name] = target
+    return files
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def image_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, not fork: the parent runs an event loop and DB pool threads
+                _executor = ProcessPoolExecutor(
+                    max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+# Storage
+class LocalStorage:
+    """Store files under a directory served as static files"""
+
+    def __init__(self, root: Path = UPLOADS_DIR, base_url: str = UPLOADS_URL):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, path: str, key: str) -> str:
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(path, target)
+        return f"{self.base_url}/{key}"
+
+
+class CloudinaryStorage:
+    """Upload files to Cloudinary; credentials come from CLOUDINARY_URL"""
+
+    def __init__(self, folder: str = os.getenv("CLOUDINARY_FOLDER", "biomedis")):
+        self.folder = folder
+
+    def save(self, path: str, key: str) -> str:
+        import cloudinary.uploader
+
+        public_id = f"{self.folder}/{os.path.splitext(key)[0]}"
+        result = cloudinary.uploader.upload(
+            path, public_id=public_id, resource_type="image", overwrite=True, invalidate=True
+        )
+        return result["secure_url"]
+
+
+STORAGES = {"local": LocalStorage, "cloudinary": CloudinaryStorage}
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if IMAGE_STORAGE not in STORAGES:
+            raise RuntimeError(f"Unknown IMAGE_STORAGE: {IMAGE_STORAGE}")
+        _storage = STORAGES[IMAGE_STORAGE]()
+    return _storage
+
+
+async def process_upload(path: Path, digest: str, prefix: str) -> Dict[str, str]:
+    """Render the variants of an uploaded file and store them; returns {name: url}.
+
+    Decoding happens in the process pool and storage I/O in a worker thread,
+    so the event loop only awaits. The uploaded file is removed afterwards.
+    """
+    work_dir = tempfile.mkdtemp(prefix="variants-", dir=IMAGE_TMP_DIR)
+    try:
+        loop = asyncio.get_running_loop()
+        files = await loop.run_in_executor(image_executor(), make_variants, str(path), work_dir)
+        storage = get_storage()
+        urls = {}
+        for name, file in files.items():
+            # Content-addressed keys, so a new upload never reuses a cached URL
+            key = f"{prefix}/{digest[:16]}-{name}.webp"
+            urls[name] = await anyio.to_thread.run_sync(storage.save, file, key)
+        return urls
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        Path(path).unlink(missing_ok=True)
@@ -0,0 +1,485 @@
+"""
+Background jobs: slow admin work (product imports, image variants, catalog
+refreshes, search reindexing) runs outside the request that asked for it,
+which only queues a row in the jobs table and answers 202 with its id.
+
+Every app worker process runs JOB_WORKERS job loops in its event loop,
+started by the lifespan handler, so the jobs are spread over all gunicorn
+workers. A loop claims the next due job with SELECT ... FOR UPDATE SKIP
+LOCKED on PostgreSQL, or with a conditional UPDATE on SQLite, so a job runs
+in exactly one of them. The running job's row is heartbeated; a job whose
+worker died is queued again once JOB_LEASE_SECONDS pass without one.
+
+Uploaded files wait for their job in JOB_DIR, on local disk: every process
+that runs jobs must see it (all workers of one host do).
+
+A dedicated worker process, with JOB_WORKERS=0 on the web processes:
+    python -m app.jobs
+"""
+import asyncio
+import functools
+import inspect
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+import anyio.to_thread
+from dotenv import load_dotenv
+from sqlalchemy.orm.session import Session
+
+from app.database import SessionLocal
+from app.metrics import JOB_DURATION, JOBS_FINISHED, JOBS_RUNNING
+from app.models import Job
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 1))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+# A running job not heartbeated for this long is considered abandoned
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+# Delay before the second attempt, doubled for each following one
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", 10))
+# How long shutdown waits for running jobs before leaving them to the lease
+JOB_SHUTDOWN_GRACE = float(os.getenv("JOB_SHUTDOWN_GRACE", 10))
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "biomedis-jobs"))
+PROGRESS_INTERVAL = 1.0
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+STATUSES = (QUEUED, RUNNING, SUCCEEDED, FAILED)
+
+
+class JobError(Exception):
+    """A failure that retrying cannot fix, e.g. an invalid upload"""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Handlers
+class JobHandler(NamedTuple):
+    function: Callable
+    max_attempts: int
+
+
+HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """Register function(job, **payload) as the handler of a job kind.
+
+    Plain functions run in a worker thread, coroutine functions in the event
+    loop. The return value, if any, must be JSON serialisable.
+    """
+    def register(function):
+        HANDLERS[kind] = JobHandler(function, max_attempts)
+        return function
+    return register
+
+
+class JobContext:
+    """What a handler gets besides its payload: the job's identity and progress reporting"""
+
+    def __init__(self, job: Job, worker_id: str):
+        self.id = job.id
+        self.kind = job.kind
+        self.attempt = job.attempts
+        self.max_attempts = job.max_attempts
+        self.worker_id = worker_id
+        self._reported = 0.0
+
+    @property
+    def last_attempt(self) -> bool:
+        return self.attempt >= self.max_attempts
+
+    def progress(self, done: float, total: Optional[float] = None, message: Optional[str] = None):
+        """Record how far the job got, at most once a second. Call from the handler's thread."""
+        now = time.monotonic()
+        if now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        values = {Job.heartbeat_at: utcnow()}
+        if total:
+            values[Job.progress] = max(0, min(99, int(done * 100 / total)))
+        if message is not None:
+            values[Job.message] = message[:200]
+        update_job(self.id, self.worker_id, values)
+
+
+# Queue
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, delay: float = 0) -> Job:
+    """Queue a job and commit; a job loop of this process picks it up right away"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(
+        kind=kind,
+        status=QUEUED,
+        payload=payload or {},
+        progress=0,
+        attempts=0,
+        max_attempts=HANDLERS[kind].max_attempts,
+        run_after=utcnow() + timedelta(seconds=delay),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    job_runner.wake()
+    return job
+
+
+def claim_job(db: Session, worker_id: str) -> Optional[Job]:
+    """Mark the next due job as running for worker_id and return it, or None"""
+    now = utcnow()
+    due = (
+        db.query(Job.id)
+        .filter(Job.status == QUEUED, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(1)
+    )
+    claim = {
+        Job.status: RUNNING,
+        Job.locked_by: worker_id,
+        Job.attempts: Job.attempts + 1,
+        Job.started_at: now,
+        Job.heartbeat_at: now,
+    }
+    if db.get_bind().dialect.name == "postgresql":
+        # Rows locked by another worker's claim are skipped, not waited for
+        job_id = due.with_for_update(skip_locked=True).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        db.query(Job).filter(Job.id == job_id).update(claim, synchronize_session=False)
+    else:
+        # No row locks on SQLite, but writes are serialized: the status check
+        # in the UPDATE lets exactly one of two racing workers have the job
+        job_id = due.scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == QUEUED)
+            .update(claim, synchronize_session=False)
+        )
+        if not claimed:
+            db.rollback()
+            return None
+    db.commit()
+    return db.get(Job, job_id)
+
+
+def requeue_abandoned(db: Session, lease: float = JOB_LEASE_SECONDS) -> int:
+    """Queue again the running jobs nobody heartbeated for lease seconds, or fail them if out of attempts"""
+    now = utcnow()
+    abandoned = db.query(Job).filter(Job.status == RUNNING, Job.heartbeat_at < now - timedelta(seconds=lease))
+    failed = abandoned.filter(Job.attempts >= Job.max_attempts).update(
+        {Job.status: FAILED, Job.error: "The worker running the job stopped", Job.finished_at: now, Job.locked_by: None},
+        synchronize_session=False,
+    )
+    requeued = abandoned.filter(Job.attempts < Job.max_attempts).update(
+        {Job.status: QUEUED, Job.run_after: now, Job.locked_by: None},
+        synchronize_session=False,
+    )
+    db.commit()
+    if failed or requeued:
+        print(f"⚠️ Recovered abandoned jobs: {requeued} queued again, {failed} failed")
+    return failed + requeued
+
+
+def update_job(job_id: int, worker_id: str, values: dict) -> bool:
+    """Update a job the worker still holds; False once it lost it to requeue_abandoned()"""
+    db = SessionLocal()
+    try:
+        updated = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+            .update(values, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def spool_upload(chunks: Iterable[bytes]) -> Path:
+    """Write a request body to JOB_DIR for a job to read later. Runs in a worker thread."""
+    os.makedirs(JOB_DIR, exist_ok=True)
+    fd, name = tempfile.mkstemp(prefix="upload-", dir=JOB_DIR)
+    path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+# Worker loops
+class JobRunner:
+    """The job loops of this process"""
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self._recovered_at = 0.0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self):
+        if self.workers <= 0 or self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = [asyncio.create_task(self._work(f"{prefix}:{n}")) for n in range(self.workers)]
+        print(f"✅ {self.workers} job worker(s) started in process {os.getpid()}")
+
+    def wake(self):
+        """Wake the idle loops of this process; safe to call from any thread"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def stop(self, grace: float = JOB_SHUTDOWN_GRACE):
+        """Let running jobs finish for up to grace seconds; the lease recovers the others"""
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if pending:
+            print(f"⚠️ {len(pending)} job(s) still running at shutdown, left to the lease")
+        self._tasks = []
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "workers": len(self._tasks),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+        }
+
+    def _next_job(self, worker_id: str) -> Optional[Job]:
+        db = SessionLocal()
+        try:
+            now = time.monotonic()
+            if now - self._recovered_at >= JOB_LEASE_SECONDS / 2:
+                self._recovered_at = now
+                requeue_abandoned(db)
+            return claim_job(db, worker_id)
+        finally:
+            db.close()
+
+    async def _work(self, worker_id: str):
+        errors = 0
+        while not self._stopping:
+            try:
+                job = await anyio.to_thread.run_sync(self._next_job, worker_id)
+                errors = 0
+            except Exception as e:
+                if not errors:
+                    print(f"⚠️ Job worker {worker_id} cannot read the queue: {e}")
+                errors += 1
+                job = None
+            if job is None:
+                await self._idle(min(self.poll_interval * 2 ** errors, 60))
+                continue
+            try:
+                await self._run(job, worker_id)
+            except Exception as e:
+                print(f"❌ Job worker {worker_id} could not record job {job.id}: {e}")
+
+    async def _idle(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if not self._stopping:
+            self._wakeup.clear()
+
+    async def _heartbeat(self, job: JobContext):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await anyio.to_thread.run_sync(update_job, job.id, job.worker_id, {Job.heartbeat_at: utcnow()})
+            except Exception as e:
+                print(f"⚠️ Heartbeat of job {job.id} failed: {e}")
+
+    async def _run(self, row: Job, worker_id: str):
+        job = JobContext(row, worker_id)
+        handler = HANDLERS.get(row.kind)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        JOBS_RUNNING.labels(row.kind).inc()
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise JobError(f"No handler for job kind {row.kind!r}")
+            call = functools.partial(handler.function, job, **(row.payload or {}))
+            if inspect.iscoroutinefunction(handler.function):
+                result = await call()
+            else:
+                result = await anyio.to_thread.run_sync(call)
+        except Exception as e:
+            # A cancelled job (shutdown) is not caught here: it stays running
+            # until its lease runs out
+            error = str(e) or type(e).__name__
+            if isinstance(e, JobError) or job.last_attempt:
+                outcome, values = FAILED, {Job.status: FAILED, Job.finished_at: utcnow()}
+                self.failed += 1
+                print(f"❌ Job {job.id} ({job.kind}) failed: {error}")
+            else:
+                delay = JOB_RETRY_SECONDS * 2 ** (job.attempt - 1)
+                outcome, values = "retried", {Job.status: QUEUED, Job.run_after: utcnow() + timedelta(seconds=delay)}
+                print(f"⚠️ Job {job.id} ({job.kind}) attempt {job.attempt} failed, retrying in {delay:.0f}s: {error}")
+            values.update({Job.error: error, Job.locked_by: None})
+        else:
+            outcome, values = SUCCEEDED, {
+                Job.status: SUCCEEDED,
+                Job.result: result,
+                Job.error: None,
+                Job.progress: 100,
+                Job.finished_at: utcnow(),
+                Job.locked_by: None,
+            }
+            self.succeeded += 1
+        finally:
+            heartbeat.cancel()
+            JOBS_RUNNING.labels(row.kind).dec()
+            JOB_DURATION.labels(row.kind).observe(time.perf_counter() - started)
+
+        JOBS_FINISHED.labels(row.kind, outcome).inc()
+        if not await anyio.to_thread.run_sync(update_job, job.id, worker_id, values):
+            print(f"⚠️ Job {job.id} was taken over by another worker, its outcome is dropped")
+
+
+job_runner = JobRunner()
+
+
+# Handlers
+@job_handler("import_products")
+def import_products(job: JobContext, path: str, content_type: str, format: Optional[str] = None, batch_size: int = 1000):
+    """Upsert products from an uploaded CSV/NDJSON body spooled to path"""
+    from app import bulk_import
+
+    size = os.path.getsize(path)
+    read = 0
+
+    def chunks():
+        nonlocal read
+        for chunk in bulk_import.read_chunks(path):
+            read += len(chunk)
+            yield chunk
+
+    def on_batch(stats):
+        job.progress(read, size, f"{stats['batch']} batches, {stats['rows_per_second']} rows/s")
+
+    retry = False
+    db = SessionLocal()
+    try:
+        report = bulk_import.import_upload(db, chunks(), content_type, format, batch_size, on_batch=on_batch)
+    except ValueError as e:
+        raise JobError(str(e))
+    except Exception:
+        # Upserts by name: running the whole file again is safe
+        retry = not job.last_attempt
+        raise
+    finally:
+        db.close()
+        if not retry:
+            Path(path).unlink(missing_ok=True)
+    return report.to_dict()
+
+
+def _store_product_images(product_id: int, urls: dict) -> bool:
+    from app import crud
+
+    db = SessionLocal()
+    try:
+        product = crud.get_product(db, product_id)
+        if product is None:
+            return False
+        crud.set_product_images(db, product, urls)
+        return True
+    finally:
+        db.close()
+
+
+# The upload is removed once processed, so there is nothing to retry with
+@job_handler("process_image", max_attempts=1)
+async def process_image(job: JobContext, product_id: int, path: str, digest: str):
+    """Render and store the WebP variants of an uploaded product photo"""
+    from app import images
+
+    urls = await images.process_upload(Path(path), digest, prefix=f"products/{product_id}")
+    if not await anyio.to_thread.run_sync(_store_product_images, product_id, urls):
+        raise JobError(f"Product {product_id} no longer exists")
+    print(f"🖼️ Stored {len(urls)} image variants for product {product_id}")
+    return {"product_id": product_id, "variants": urls}
+
+
+@job_handler("refresh_catalog")
+def refresh_catalog(job: JobContext):
+    """Recompute every category's stats and the featured list, then drop the cached catalog"""
+    from app.cache import catalog_cache
+    from app.crud import refresh_category_stats, refresh_featured, touch_catalog
+    from app.models import Category
+
+    db = SessionLocal()
+    try:
+        category_ids = [id for (id,) in db.query(Category.id)]
+        refresh_category_stats(db, category_ids)
+        refresh_featured(db)
+        touch_catalog(db)
+        db.commit()
+    finally:
+        db.close()
+    catalog_cache.invalidate()
+    return {"categories": len(category_ids)}
+
+
+@job_handler("reindex_search")
+def reindex_search(job: JobContext):
+    """Rebuild the product full-text index"""
+    from app.database import engine
+    from app.search import rebuild_index
+
+    started = time.perf_counter()
+    dialect = rebuild_index(engine)
+    return {"dialect": dialect, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main():
+    """Run job loops in this process only, until interrupted"""
+    runner = JobRunner(workers=max(1, JOB_WORKERS))
+
+    async def run():
+        runner.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("👋 Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
+from app.startup import report as startup_report  # first import: starts the startup clock
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, render_metrics
+from app.ratelimit import RateLimitMiddleware
+from app.serialization import FastJSONResponse
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -14,105 +19,159 @@ is_production = environment == "production"
 
 # Get the base directory path
 BASE_DIR = Path(__file__).parent.parent
-
-app = FastAPI(
-    title="Lab Equipment Company",
-    description="E-commerce platform for laboratory equipment and reagents",
-    version="1.0.0",
-    docs_url="/docs" if not is_production else None,
-    redoc_url="/redoc" if not is_production else None,
-)
-
-# Configure CORS based on environment
-if is_production:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["https://your-domain.onrender.com"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-else:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-
-# Create static and templates directories if they don't exist
 static_dir = BASE_DIR / "app" / "static"
 templates_dir = BASE_DIR / "app" / "templates"
 
-# Create directories if they don't exist
-static_dir.mkdir(parents=True, exist_ok=True)
-templates_dir.mkdir(parents=True, exist_ok=True)
-
-# Create subdirectories
-(static_dir / "css").mkdir(exist_ok=True)
-(static_dir / "images").mkdir(exist_ok=True)
-
-print(f"Static directory: {static_dir}")
-print(f"Templates directory: {templates_dir}")
-
-# Mount static files
-try:
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
-    print("✅ Static files mounted successfully")
-except Exception as e:
-    print(f"❌ Error mounting static files: {e}")
-
-# Configure templates
-try:
-    templates = Jinja2Templates(directory=str(templates_dir))
-    print("✅ Templates configured successfully")
-except Exception as e:
-    print(f"❌ Error configuring templates: {e}")
-
-# Import routers inside functions to avoid circular imports
-@app.on_event("startup")
-async def startup_event():
-    """Import routers after app is created to avoid circular imports"""
-    from app.routers import frontend, admin, auth
-    
-    app.include_router(frontend.router)
-    app.include_router(admin.router)
-    app.include_router(auth.router)
-    print("✅ Routers loaded successfully")
-
-# @app.get("/")
-# async def root():
-#     return {"message": "Lab Equipment Company API is running!", "environment": environment}
-
-@app.get("/health")
-async def health_check():
-    static_exists = static_dir.exists()
-    templates_exists = templates_dir.exists()
-    
-    return {
-        "status": "healthy", 
-        "environment": environment,
-        "static_files": "available" if static_exists else "missing",
-        "templates": "available" if templates_exists else "missing"
-    }
-
-# Production-specific middleware
-if is_production:
-    @app.middleware("http")
-    async def add_security_headers(request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        return response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm each worker before it takes traffic, release its pools on exit"""
+    from app import startup
+
+    # Already done by the gunicorn master when the app is preloaded
+    if not startup_report.preloaded:
+        with startup_report.phase("heavy_imports") as info:
+            info["modules"] = startup.import_heavy_modules()
+        with startup_report.phase("templates") as info:
+            info["templates"] = startup.compile_templates()
+    with startup_report.phase("db_pool") as info:
+        info.update(await startup.warm_db_pool())
+    startup_report.ready()
+    startup_report.log()
+    app.state.startup = startup_report
+
+    from app.jobs import job_runner
+
+    job_runner.start()
+
+    yield
+
+    from app.database import async_engine, async_replica_engine, engine, replica_engine
+    from app.hashing import hashing_pool
+    from app.images import shutdown_executor
+
+    # Before the pools go away: running jobs may still need them
+    await job_runner.stop()
+    shutdown_executor()
+    hashing_pool.shutdown()
+    for each in {async_engine, async_replica_engine} - {None}:
+        await each.dispose()
+    for each in {engine, replica_engine}:
+        each.dispose()
+
+
+def create_app() -> FastAPI:
+    """Build the application with every router and mount in place"""
+    startup_report.record_imports()
+    with startup_report.phase("create_app"):
+        app = FastAPI(
+            title="Lab Equipment Company",
+            description="E-commerce platform for laboratory equipment and reagents",
+            version="1.0.0",
+            docs_url="/docs" if not is_production else None,
+            redoc_url="/redoc" if not is_production else None,
+            lifespan=lifespan,
+            default_response_class=FastJSONResponse,
+        )
+
+        # Configure CORS based on environment
+        if is_production:
+            app.add_middleware(
+                CORSMiddleware,
+                allow_origins=["https://your-domain.onrender.com"],
+                allow_credentials=True,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            )
+        else:
+            app.add_middleware(
+                CORSMiddleware,
+                allow_origins=["*"],
+                allow_credentials=True,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            )
+
+        # gzip/brotli for dynamic responses; precompressed assets pass through
+        app.add_middleware(CompressionMiddleware)
+
+        # Rejects excess login/register attempts before any password hashing
+        app.add_middleware(RateLimitMiddleware)
+
+        # Production-specific middleware
+        if is_production:
+            @app.middleware("http")
+            async def add_security_headers(request: Request, call_next):
+                response = await call_next(request)
+                response.headers["X-Frame-Options"] = "DENY"
+                response.headers["X-Content-Type-Options"] = "nosniff"
+                response.headers["X-XSS-Protection"] = "1; mode=block"
+                return response
+
+        # Added last, so it is outermost and latency includes every other middleware
+        app.add_middleware(MetricsMiddleware)
+
+        # Mount static files (fingerprinted builds under /static/dist are served
+        # precompressed with immutable caching, see app/assets.py)
+        try:
+            from app.assets import PrecompressedStaticFiles
+            static_dir.mkdir(parents=True, exist_ok=True)
+            app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+        except Exception as e:
+            print(f"❌ Error mounting static files: {e}")
+
+        # Routers are part of the app from the start, not added at startup
+        from app.routers import frontend, admin, auth, catalog
+        app.include_router(frontend.router)
+        app.include_router(admin.router)
+        app.include_router(auth.router)
+        app.include_router(catalog.router)
+
+        @app.get("/health")
+        async def health_check(request: Request):
+            startup = getattr(request.app.state, "startup", None)
+            return {
+                "status": "healthy",
+                "environment": environment,
+                "static_files": "available" if static_dir.exists() else "missing",
+                "templates": "available" if templates_dir.exists() else "missing",
+                "startup": startup.to_dict() if startup is not None else None,
+            }
+
+        # Platform probes: liveness never touches the database, readiness is
+        # cached and answers 503 when this worker's connection pool is exhausted
+        @app.get("/health/live", include_in_schema=False)
+        async def liveness():
+            from app.health import liveness
+
+            return liveness()
+
+        @app.get("/health/ready", include_in_schema=False)
+        async def readiness():
+            from app.health import readiness
+
+            ready, report = await readiness()
+            return FastJSONResponse(
+                report, status_code=200 if ready else 503, headers={"Cache-Control": "no-store"}
+            )
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics():
+            return render_metrics()
+
+    return app
+
+
+# `uvicorn app.main:app` / `gunicorn app.main:app`; `uvicorn --factory
+# app.main:create_app` builds a fresh instance instead.
+app = create_app()
 
 # This allows running with python app/main.py directly
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
-        "app.main:app", 
-        host="0.0.0.0", 
-        port=8000, 
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
         reload=True if os.getenv("DEBUG") == "True" else False
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,326 @@
+"""
+Prometheus metrics: request latency and status per route, requests in
+flight, SQLAlchemy pool usage and per-request query counts, checked against
+each route's query budget (see max_queries), plus caches, rate limiting,
+background jobs and password hashing.
+
+Under gunicorn set PROMETHEUS_MULTIPROC_DIR (start.sh does) so every worker
+writes its samples to that directory and /metrics reports the sum of all
+workers rather than whichever one answered the scrape.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from dotenv import load_dotenv
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+load_dotenv()
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# What to do when a request runs more SQL statements than its route allows:
+# "raise" (tests), "warn" or "off"
+SQL_QUERY_GUARD = os.getenv("SQL_QUERY_GUARD", "off")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# HTTP
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to send the full response", ["method", "route"],
+    buckets=REQUEST_BUCKETS,
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled", ["method"], multiprocess_mode="livesum"
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_QUERY_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ["route"], buckets=REQUEST_BUCKETS
+)
+
+# Database
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["engine"], buckets=QUERY_BUCKETS
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["engine"], multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", ["engine"], multiprocess_mode="livesum"
+)
+POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool_size, summed over live workers", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time to get a pooled connection, opening a new one included", ["engine"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout", ["engine"]
+)
+
+# Caches (see app/cache.py)
+CACHE_COALESCED = Counter(
+    "cache_coalesced_total", "Requests that waited for another request's load of the same key", ["cache"]
+)
+CACHE_STALE_SERVED = Counter(
+    "cache_stale_served_total", "Requests served an expired entry while it was being refreshed", ["cache"]
+)
+
+# Rate limiting (see app/ratelimit.py)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected with 429, by the rule that tripped", ["rule"]
+)
+
+# Background jobs (see app/jobs.py)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+JOBS_FINISHED = Counter(
+    "jobs_finished_total", "Background job runs by kind and outcome (succeeded, retried, failed)",
+    ["kind", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "Time to run one background job attempt", ["kind"], buckets=JOB_BUCKETS
+)
+JOBS_RUNNING = Gauge(
+    "jobs_running", "Background jobs being run", ["kind"], multiprocess_mode="livesum"
+)
+
+# Password hashing (see app/hashing.py)
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HASH_SECONDS = Histogram(
+    "hash_seconds", "Time to hash or verify one password on a hashing thread", buckets=HASH_BUCKETS
+)
+HASH_QUEUE_WAIT = Histogram(
+    "hash_queue_wait_seconds", "Time a password hash waited for a free hashing thread", buckets=HASH_BUCKETS
+)
+HASH_PENDING = Gauge(
+    "hash_pending", "Password hashes waiting or running", multiprocess_mode="livesum"
+)
+HASH_REJECTED = Counter(
+    "hash_rejected_total", "Password hashes turned away because the hashing queue was full"
+)
+
+# Startup
+STARTUP_SECONDS = Gauge(
+    "app_startup_seconds", "Duration of each startup phase (see app/startup.py)", ["phase"],
+    multiprocess_mode="max",
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+# Set by the middleware for the duration of a request. Worker threads and
+# SQLAlchemy's async greenlets run with a copy of the context, so they see
+# (and update) the same RequestStats object.
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+# Query budgets
+class QueryBudgetExceeded(AssertionError):
+    """More SQL statements than declared, usually a lazy load per row (N+1)"""
+
+
+def max_queries(limit: int):
+    """Declare how many SQL statements one request to this endpoint may run"""
+    def decorate(endpoint):
+        endpoint.max_queries = limit
+        return endpoint
+    return decorate
+
+
+def check_query_budget(label: str, queries: int, limit: Optional[int], mode: Optional[str] = None):
+    mode = mode or SQL_QUERY_GUARD
+    if limit is None or queries <= limit or mode == "off":
+        return
+    message = f"{label} ran {queries} SQL statements, its budget is {limit}"
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    print(f"⚠️ {message}")
+
+
+@contextmanager
+def assert_max_queries(limit: int, label: str = "block"):
+    """Count the statements run inside the block and fail if there are more than limit"""
+    outer = _request_stats.get()
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+        if outer is not None:
+            outer.queries += stats.queries
+            outer.query_seconds += stats.query_seconds
+    check_query_budget(label, stats.queries, limit, mode="raise")
+
+
+def route_label(scope: Scope, path: str) -> str:
+    """Route template ("/api/products/{product_id}") to keep label cardinality bounded"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if path.startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request up to its last body chunk"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        # Mounts rewrite scope["path"] while routing, so keep the original
+        path = scope["path"]
+        status = {"code": 500}
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        # The route is only known once routing has run, so requests in
+        # flight are counted per method
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_stats.reset(token)
+            route = route_label(scope, path)
+            REQUESTS.labels(method, route, str(status["code"])).inc()
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_QUERY_TIME.labels(route).observe(stats.query_seconds)
+
+        endpoint = getattr(scope.get("route"), "endpoint", None)
+        check_query_budget(f"{method} {route}", stats.queries, getattr(endpoint, "max_queries", None))
+
+
+# SQLAlchemy instrumentation
+def _update_pool_gauges(pool, name: str, returning: int = 0):
+    """returning: connections being checked in, which the pool still counts as out"""
+    for method, gauge, adjust in (
+        ("checkedout", POOL_CHECKED_OUT, returning),
+        ("overflow", POOL_OVERFLOW, 0),
+        ("size", POOL_SIZE, 0),
+    ):
+        if hasattr(pool, method):
+            gauge.labels(name).set(max(getattr(pool, method)() - adjust, 0))
+
+
+def instrument_engine(engine, name: str):
+    """Attach query timing and pool usage hooks to a sync Engine.
+
+    engine.dispose() (gunicorn's post_fork) replaces engine.pool; the new
+    pool inherits these listeners, so they read engine.pool when they fire
+    rather than keeping the pool of the moment.
+    """
+    pool = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        QUERY_LATENCY.labels(name).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _update_pool_gauges(engine.pool, name)
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        # Fires before the connection is back in the pool
+        _update_pool_gauges(engine.pool, name, returning=1)
+
+    @event.listens_for(engine, "engine_disposed")
+    def on_disposed(engine):
+        # Connections of the old pool are no longer this engine's
+        _update_pool_gauges(engine.pool, name)
+
+    # Pool events fire only once a connection is handed out, so the wait for
+    # one is timed around the engine's checkout, which every Connection (sync
+    # or async) goes through. Being on the engine, it outlives dispose().
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            POOL_WAIT.labels(name).observe(time.perf_counter() - start)
+
+    engine.raw_connection = timed_raw_connection
+
+
+def render_metrics() -> Response:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        from prometheus_client import REGISTRY as registry
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid: int):
+    """Drop a dead worker's live gauges; called from gunicorn's child_exit hook"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey, Index, JSON, DDL, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 # from database import Base
 from app.database import Base
 
+# SQLite stores CURRENT_TIMESTAMP without fractional seconds; store ORM-written
+# values the same way so keyset comparisons on these columns line up.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(timezone=True, truncate_microseconds=True), "sqlite"
+)
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -12,6 +19,12 @@ class Category(Base):
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Denormalized from products, kept in the same transaction as every
+    # product write by crud.refresh_category_stats()
+    product_count = Column(Integer, nullable=False, default=0, server_default="0")
+    min_price = Column(Numeric(10, 2))
+    max_price = Column(Numeric(10, 2))
+
     # Relationship with Products
     products = relationship("Product", back_populates="category")
 
@@ -23,9 +36,10 @@ class Product(Base):
     description = Column(Text)
     price = Column(Numeric(10, 2))  # 10 digits total, 2 after decimal
     image_url = Column(String(500))
+    image_variants = Column(JSON)  # variant name -> URL, see app/images.py
     is_featured = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now())
 
     # ForeignKey to Category
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
@@ -33,6 +47,68 @@ class Product(Base):
     # Relationship with Category
     category = relationship("Category", back_populates="products")
 
+    # Keyset pagination indexes: every listing order ends with id as tie-breaker
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_category_id_created_at_id", "category_id", "created_at", "id"),
+        # Price orders inside a category, and the facet counts (crud.get_product_facets)
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+        # Featured products are a small subset: index only those rows
+        Index(
+            "ix_products_featured_created_at_id", "created_at", "id",
+            postgresql_where=is_featured.is_(True),
+            sqlite_where=is_featured.is_(True),
+        ),
+    )
+
+# Full-text search structures live outside the ORM columns so both dialects
+# can use their native index. The Alembic migration creates them on existing
+# databases; these hooks cover databases built with metadata.create_all().
+PRODUCTS_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+        "CREATE INDEX ix_products_search_vector ON products USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "name, description, content='products', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 0')",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    ],
+}
+
+for _dialect, _statements in PRODUCTS_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
+
+class CatalogState(Base):
+    """Single row whose version is bumped in every catalog write transaction"""
+    __tablename__ = "catalog_state"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Timestamp, server_default=func.now())
+    # Newest featured product ids, refreshed by crud.refresh_featured()
+    featured_ids = Column(JSON)
+
+event.listen(
+    CatalogState.__table__,
+    "after_create",
+    DDL("INSERT INTO catalog_state (id, version, updated_at) VALUES (1, 0, CURRENT_TIMESTAMP)"),
+)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -42,4 +118,34 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     role = Column(String(20), default="admin")
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Job(Base):
+    """Background job, run by the job workers of app/jobs.py"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed
+    payload = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    progress = Column(Integer, nullable=False, default=0)  # percent
+    message = Column(String(200))
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(Timestamp, nullable=False, server_default=func.now())
+    locked_by = Column(String(100))  # host:pid:worker of the claiming worker
+    heartbeat_at = Column(Timestamp)
+    created_at = Column(Timestamp, server_default=func.now())
+    started_at = Column(Timestamp)
+    finished_at = Column(Timestamp)
+
+    # Workers poll for the next due job: index only the queued ones
+    __table_args__ = (
+        Index(
+            "ix_jobs_queued_run_after_id", "run_after", "id",
+            postgresql_where=status == "queued",
+            sqlite_where=status == "queued",
+        ),
+    )
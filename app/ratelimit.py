@@ -0,0 +1,285 @@
+"""
+Token-bucket rate limiting for the bcrypt-bound auth endpoints.
+
+Requests to /auth/login and /auth/register take a token from a bucket per
+client IP and, for login, from one per username. An empty bucket answers
+429 with Retry-After from the middleware, before the route (and its password
+hashing) runs. So that the per-username limit cannot be dodged, bodies of a
+type the route does not take are answered 415, and oversized ones 413.
+
+Buckets live in memory per worker by default (bounded, least recently used
+first out). With RATE_LIMIT_BACKEND=sqlite they live in a SQLite file shared
+by every worker on the host, standing in for Redis, so the limits hold no
+matter which worker a request lands on.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import anyio.to_thread
+from dotenv import load_dotenv
+from starlette.datastructures import Headers
+from starlette.formparsers import FormParser, MultiPartException, MultiPartParser
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import RATE_LIMITED
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True") == "True"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 10000))
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "/tmp/biomedis-ratelimit.db")
+# Login and registration bodies are tiny; larger ones are refused (413)
+MAX_BODY_BYTES = 16 * 1024
+
+
+class Rule(NamedTuple):
+    """Bucket of `capacity` requests, refilled at capacity per `period` seconds"""
+    name: str
+    capacity: int
+    period: float
+    key: str  # "ip" or "username"
+
+
+def parse_rate(value: str) -> Tuple[int, float]:
+    """"10/60" -> (10, 60.0): 10 requests per 60 seconds"""
+    capacity, period = value.split("/")
+    return int(capacity), float(period)
+
+
+RULES = {
+    ("POST", "/auth/login"): (
+        Rule("login_ip", *parse_rate(os.getenv("RATE_LIMIT_LOGIN_IP", "20/60")), key="ip"),
+        Rule("login_username", *parse_rate(os.getenv("RATE_LIMIT_LOGIN_USERNAME", "5/60")), key="username"),
+    ),
+    ("POST", "/auth/register"): (
+        Rule("register_ip", *parse_rate(os.getenv("RATE_LIMIT_REGISTER_IP", "5/300")), key="ip"),
+    ),
+}
+# Media types each limited route accepts; anything else is refused (415)
+BODY_TYPES = {
+    ("POST", "/auth/login"): ("application/x-www-form-urlencoded", "multipart/form-data"),
+    ("POST", "/auth/register"): ("application/json",),
+}
+# A bucket untouched for this long has refilled completely and can be dropped
+IDLE_SECONDS = max(rule.period for rules in RULES.values() for rule in rules)
+
+
+def take_token(tokens: float, updated: float, now: float, rule: Rule) -> Tuple[bool, float, float]:
+    """Refill a bucket up to now and try to take one token: (allowed, tokens left, retry after)"""
+    rate = rule.capacity / rule.period
+    tokens = min(rule.capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+# Backends
+class MemoryBackend:
+    """Buckets of this process only, at most max_keys of them"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rule: Rule) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.capacity, now))
+            allowed, tokens, retry_after = take_token(tokens, updated, now, rule)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file shared by every worker on the host"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process: never reuse one across a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def hit(self, key: str, rule: Rule) -> Tuple[bool, float]:
+        conn = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so the read-modify-write
+        # of a bucket is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row is not None else (rule.capacity, now)
+            allowed, tokens, retry_after = take_token(tokens, updated, now, rule)
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+def get_backend(name: str = RATE_LIMIT_BACKEND):
+    if name not in BACKENDS:
+        print(f"⚠️ Unknown RATE_LIMIT_BACKEND {name!r}, using memory")
+        name = "memory"
+    return BACKENDS[name]()
+
+
+# Middleware
+def client_ip(scope: Scope) -> str:
+    """Client address as uvicorn resolved it (X-Forwarded-For from trusted proxies)"""
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def media_type(headers: Headers) -> str:
+    return headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+async def extract_username(body: bytes, headers: Headers) -> Optional[str]:
+    """The username field of a form or JSON body, as the route will read it"""
+    try:
+        kind = media_type(headers)
+        if kind in ("application/x-www-form-urlencoded", "multipart/form-data"):
+            # Starlette's own parsers, the ones the route's form goes through:
+            # a repeated field reads as its last value there, so it does here
+            async def stream():
+                yield body
+
+            parser = FormParser if kind == "application/x-www-form-urlencoded" else MultiPartParser
+            form = await parser(headers, stream()).parse()
+            username = form.get("username")
+            await form.close()
+        elif kind == "application/json":
+            data = json.loads(body)
+            username = data.get("username") if isinstance(data, dict) else None
+        else:
+            return None
+    except (UnicodeDecodeError, ValueError, MultiPartException):
+        return None
+    return username.strip().lower() if isinstance(username, str) and username.strip() else None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying RULES to matching requests"""
+
+    def __init__(self, app: ASGIApp, backend=None, rules=RULES, body_types=BODY_TYPES):
+        self.app = app
+        self.backend = backend if backend is not None else get_backend()
+        self.rules = rules
+        self.body_types = body_types
+        # Only the SQLite backend blocks on I/O
+        self.threaded = not isinstance(self.backend, MemoryBackend)
+
+    async def hit(self, key: str, rule: Rule) -> Tuple[bool, float]:
+        if self.threaded:
+            return await anyio.to_thread.run_sync(self.backend.hit, key, rule)
+        return self.backend.hit(key, rule)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        route = (scope.get("method"), scope.get("path"))
+        rules = self.rules.get(route) if scope["type"] == "http" else None
+        if not rules or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        allowed_types = self.body_types.get(route)
+        if allowed_types is not None and media_type(headers) not in allowed_types:
+            await self._reject(scope, receive, send, 415, f"Expected {' or '.join(allowed_types)}")
+            return
+
+        username = None
+        if any(rule.key == "username" for rule in rules):
+            declared = headers.get("content-length", "")
+            body = None
+            if not (declared.isdigit() and int(declared) > MAX_BODY_BYTES):
+                body, receive = await self._buffer_body(receive)
+            if body is None:
+                await self._reject(scope, receive, send, 413, "Request body too large")
+                return
+            username = await extract_username(body, headers)
+
+        for rule in rules:
+            subject = client_ip(scope) if rule.key == "ip" else username
+            if subject is None:
+                continue
+            allowed, retry_after = await self.hit(f"{rule.name}:{subject}", rule)
+            if not allowed:
+                RATE_LIMITED.labels(rule.name).inc()
+                response = JSONResponse(
+                    {"detail": "Too many requests, please retry later"},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status_code: int, detail: str):
+        response = JSONResponse({"detail": detail}, status_code=status_code)
+        await response(scope, receive, send)
+
+    @staticmethod
+    async def _buffer_body(receive: Receive):
+        """Read the request body, then hand the app a receive that replays it"""
+        messages = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False) or size > MAX_BODY_BYTES:
+                break
+        complete = messages[-1]["type"] == "http.request" and not messages[-1].get("more_body", False)
+        # None: cut short by a disconnect, or over MAX_BODY_BYTES
+        body = b"".join(m.get("body", b"") for m in messages) if complete and size <= MAX_BODY_BYTES else None
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return body, replay
@@ -1,8 +1,32 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
+from typing import List, Optional
+
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.session import Session
+
+from app import bulk_export, bulk_import, crud, images, jobs
+from app.cache import catalog_cache
+from app.database import ReadSessionLocal, get_db
+from app.dependencies import get_current_admin, invalidate_user, token_cache, user_cache
+from app.hashing import hashing_pool
+from app.models import Job, Product
+from app.schemas import (
+    CategoryCreate,
+    CategoryResponse,
+    CategoryUpdate,
+    JobResponse,
+    JobSummary,
+    ProductCreate,
+    ProductResponse,
+    ProductUpdate,
+    UserResponse,
+    UserUpdate,
+)
+from app.templating import page_cache, templates
 
 router = APIRouter(prefix="/admin", include_in_schema=False)
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/")
 async def admin_dashboard(request: Request):
@@ -10,4 +34,199 @@ async def admin_dashboard(request: Request):
 
 @router.get("/login")
 async def admin_login(request: Request):
-    return templates.TemplateResponse("admin/login.html", {"request": request})
\ No newline at end of file
+    return templates.TemplateResponse("admin/login.html", {"request": request})
+
+# Admin JSON API, restricted to authenticated admins. Catalog writes go
+# through crud, which invalidates the catalog cache once committed.
+api = APIRouter(prefix="/api", dependencies=[Depends(get_current_admin)])
+
+def _get_category_or_404(db: Session, category_id: int):
+    category = crud.get_category(db, category_id)
+    if category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return category
+
+def _get_product_or_404(db: Session, product_id: int):
+    product = crud.get_product(db, product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+def _check_category_exists(db: Session, category_id):
+    if category_id is not None and crud.get_category(db, category_id) is None:
+        raise HTTPException(status_code=400, detail="Category does not exist")
+
+@api.post("/categories", response_model=CategoryResponse, status_code=201)
+def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+    try:
+        return crud.create_category(db, category)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Category name already exists")
+
+@api.put("/categories/{category_id}", response_model=CategoryResponse)
+def update_category(category_id: int, changes: CategoryUpdate, db: Session = Depends(get_db)):
+    category = _get_category_or_404(db, category_id)
+    try:
+        return crud.update_category(db, category, changes)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Category name already exists")
+
+@api.delete("/categories/{category_id}", status_code=204)
+def delete_category(category_id: int, db: Session = Depends(get_db)):
+    category = _get_category_or_404(db, category_id)
+    if db.query(Product.id).filter(Product.category_id == category_id).first():
+        raise HTTPException(status_code=409, detail="Category still has products")
+    crud.delete_category(db, category)
+
+@api.post("/products", response_model=ProductResponse, status_code=201)
+def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+    _check_category_exists(db, product.category_id)
+    try:
+        return crud.create_product(db, product)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Product name already exists")
+
+@api.put("/products/{product_id}", response_model=ProductResponse)
+def update_product(product_id: int, changes: ProductUpdate, db: Session = Depends(get_db)):
+    product = _get_product_or_404(db, product_id)
+    _check_category_exists(db, changes.category_id)
+    try:
+        return crud.update_product(db, product, changes)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Product name already exists")
+
+@api.delete("/products/{product_id}", status_code=204)
+def delete_product(product_id: int, db: Session = Depends(get_db)):
+    product = _get_product_or_404(db, product_id)
+    crud.delete_product(db, product)
+
+@api.post("/products/import", response_model=JobResponse, status_code=202)
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(bulk_import.DEFAULT_BATCH_SIZE, ge=1, le=bulk_import.MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Queue an upsert of products from a multipart upload or a raw CSV/NDJSON body.
+
+    The body is spooled to disk as it arrives; parsing and the batched
+    writes run in an import_products job, whose result is the import report.
+    """
+    chunks = bulk_import.iter_async_chunks(request.stream())
+    path = await run_in_threadpool(jobs.spool_upload, chunks)
+    if path.stat().st_size == 0:
+        path.unlink()
+        raise HTTPException(status_code=400, detail="The upload is empty")
+    payload = {
+        "path": str(path),
+        "content_type": request.headers.get("content-type", ""),
+        "format": format,
+        "batch_size": batch_size,
+    }
+    return await run_in_threadpool(jobs.enqueue, db, "import_products", payload)
+
+@api.post("/products/{product_id}/image", status_code=202)
+async def upload_product_image(
+    product_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Accept a product photo as a multipart upload or a raw image body.
+
+    The file is streamed to disk and its header checked; resizing to the
+    WebP variants runs in a process_image job.
+    """
+    await run_in_threadpool(_get_product_or_404, db, product_id)
+    chunks = bulk_import.iter_async_chunks(request.stream())
+    content_type = request.headers.get("content-type", "")
+    try:
+        path, digest = await run_in_threadpool(images.save_upload, chunks, content_type)
+    except images.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = await run_in_threadpool(
+        jobs.enqueue, db, "process_image", {"product_id": product_id, "path": str(path), "digest": digest}
+    )
+    return {"product_id": product_id, "status": "processing", "variants": list(images.VARIANTS), "job_id": job.id}
+
+@api.get("/products/export")
+async def export_products(
+    format: str = Query("csv", pattern="^(csv|ndjson|jsonl)$"),
+    gzip: bool = False,
+):
+    """Stream the whole catalog, one server-side cursor batch at a time"""
+    media_type = "application/gzip" if gzip else bulk_export.FORMATS[format][0]
+    filename = bulk_export.export_filename(format, compress=gzip)
+    return StreamingResponse(
+        bulk_export.export_catalog(ReadSessionLocal, format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@api.patch("/users/{user_id}", response_model=UserResponse)
+def update_user(user_id: int, changes: UserUpdate, db: Session = Depends(get_db)):
+    user = crud.get_user(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user = crud.update_user(db, user, changes)
+    # Deactivation takes effect on the next request, not after the cache TTL
+    invalidate_user(user.username)
+    return user
+
+@api.get("/cache")
+async def cache_stats():
+    return {
+        "catalog": catalog_cache.stats(),
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+        "pages": page_cache.stats(),
+    }
+
+@api.get("/hashing")
+async def hashing_stats():
+    return hashing_pool.stats()
+
+@api.post("/catalog/refresh", response_model=JobResponse, status_code=202)
+def refresh_catalog(db: Session = Depends(get_db)):
+    """Queue a recount of every category's stats and of the featured list"""
+    return jobs.enqueue(db, "refresh_catalog")
+
+@api.post("/search/reindex", response_model=JobResponse, status_code=202)
+def reindex_search(db: Session = Depends(get_db)):
+    """Queue a rebuild of the product full-text index"""
+    return jobs.enqueue(db, "reindex_search")
+
+@api.get("/jobs", response_model=List[JobSummary])
+def list_jobs(
+    status: Optional[str] = Query(None, pattern=f"^({'|'.join(jobs.STATUSES)})$"),
+    kind: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Most recent jobs first"""
+    query = db.query(Job)
+    if status is not None:
+        query = query.filter(Job.status == status)
+    if kind is not None:
+        query = query.filter(Job.kind == kind)
+    return query.order_by(Job.id.desc()).limit(limit).all()
+
+@api.get("/jobs/workers")
+async def job_workers():
+    """Job loops of the worker process that answered"""
+    return jobs.job_runner.stats()
+
+@api.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Status, progress and, once finished, the result of a job"""
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+router.include_router(api)
@@ -1,13 +1,61 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.auth import create_access_token, get_password_hash_async, verify_dummy_password, verify_password_async
+from app.database import get_async_db
+from app.hashing import HashingOverloaded
+from app.schemas import Token, UserCreate, UserResponse
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-@router.post("/login")
-async def login():
-    # Will be implemented later
-    return {"message": "Login endpoint"}
+# bcrypt runs on the bounded hashing pool and database calls on the async
+# session, so neither blocks the event loop. A full hashing queue answers
+# 503 straight away instead of piling up more work.
+
+def _overloaded():
+    return HTTPException(
+        status_code=503,
+        detail="Authentication is temporarily overloaded, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+@router.post("/login", response_model=Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(crud.get_user_by_username, form_data.username)
+    try:
+        if user is None:
+            valid = await verify_dummy_password(form_data.password)
+        else:
+            valid = await verify_password_async(form_data.password, user.hashed_password)
+    except HashingOverloaded:
+        raise _overloaded()
+
+    if not valid or not user.is_active:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(data={"sub": user.username})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/register", response_model=UserResponse, status_code=201)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await db.run_sync(crud.get_user_by_username, user.username):
+        raise HTTPException(status_code=409, detail="Username already registered")
+    if await db.run_sync(crud.get_user_by_email, user.email):
+        raise HTTPException(status_code=409, detail="Email already registered")
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except HashingOverloaded:
+        raise _overloaded()
 
-@router.post("/register")
-async def register():
-    # Will be implemented later
-    return {"message": "Register endpoint"}
\ No newline at end of file
+    # Self-registered accounts never get elevated roles
+    try:
+        return await db.run_sync(crud.create_user, user, hashed_password)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Username or email already registered")
@@ -0,0 +1,126 @@
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, search
+from app.cache import catalog_cache
+from app.database import get_read_db
+from app.http_cache import (
+    apply_validators,
+    catalog_etag,
+    get_catalog_state,
+    is_not_modified,
+    not_modified,
+    validator_headers,
+)
+from app.metrics import max_queries
+from app.schemas import CategoryPage, ProductPage, ProductResponse, SearchResults
+from app.serialization import dumps, json_bytes_response
+
+router = APIRouter(prefix="/api", tags=["catalog"])
+
+# Catalog reads run on the async read session, served by the read replica
+# when one is configured: the query helpers in crud/search
+# are shared with the sync code and executed through AsyncSession.run_sync,
+# which drives them on the event loop without blocking it.
+# Responses carry an ETag and Last-Modified derived from the catalog version.
+# Revalidations that still match get a 304 before any page is loaded or
+# serialized, and cached pages are keyed by that same version. Every
+# endpoint caches the encoded JSON itself (see crud's row shapes), so a
+# cache hit costs no serialization at all and prices are written exactly
+# as stored (10.50) wherever a product appears.
+# max_queries is the statement budget of a request that misses every cache:
+# the catalog state, then the page itself (plus the facets or search hits).
+
+async def _serve(request: Request, response: Response, db: AsyncSession, key: tuple, load):
+    state = await get_catalog_state(db)
+    etag = catalog_etag(request, state)
+    if is_not_modified(request, etag, state.updated_at):
+        return not_modified(etag, state.updated_at)
+    value = await catalog_cache.get_or_load_async(key + (state.version,), lambda: db.run_sync(load))
+    if isinstance(value, bytes):
+        # Encoded by the row path: sent as is, without response_model validation
+        return json_bytes_response(value, validator_headers(etag, state.updated_at))
+    apply_validators(response, etag, state.updated_at)
+    return value
+
+@router.get("/categories", response_model=CategoryPage)
+@max_queries(2)
+async def list_categories(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
+    def load(session):
+        items, next_cursor = crud.get_category_rows_page(session, cursor=cursor, limit=limit)
+        return dumps({"items": items, "next_cursor": next_cursor})
+
+    try:
+        return await _serve(request, response, db, ("categories", cursor, limit), load)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/products", response_model=ProductPage)
+@max_queries(3)
+async def list_products(
+    request: Request,
+    response: Response,
+    category_id: Optional[int] = None,
+    sort: str = Query("newest", pattern="^(newest|price_asc|price_desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Exclusive upper bound"),
+    facets: bool = Query(False, description="Include category and price bucket counts"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    def load(session):
+        items, next_cursor = crud.get_product_rows_page(
+            session, category_id=category_id, sort=sort, cursor=cursor, limit=limit,
+            min_price=min_price, max_price=max_price,
+        )
+        page = {"items": items, "next_cursor": next_cursor, "facets": None}
+        if facets:
+            page["facets"] = crud.get_product_facets(
+                session, category_id=category_id, min_price=min_price, max_price=max_price
+            )
+        return dumps(page)
+
+    key = ("products", category_id, sort, cursor, limit, min_price, max_price, facets)
+    try:
+        return await _serve(request, response, db, key, load)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/products/{product_id}", response_model=ProductResponse)
+@max_queries(2)
+async def get_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    def load(session):
+        product = crud.get_product_row(session, product_id)
+        return dumps(product) if product is not None else None
+
+    product = await _serve(request, response, db, ("product", product_id), load)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+@router.get("/search", response_model=SearchResults)
+@max_queries(3)
+async def search_products(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category_id: Optional[int] = None,
+    limit: int = Query(search.DEFAULT_SEARCH_RESULTS, ge=1, le=search.MAX_SEARCH_RESULTS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    def load(session):
+        hits = search.search_products(session, q, category_id=category_id, limit=limit)
+        return dumps({"query": q, "items": hits})
+
+    key = ("search", tuple(search.search_terms(q)), category_id, limit)
+    return await _serve(request, response, db, key, load)
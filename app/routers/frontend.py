@@ -1,19 +1,59 @@
-from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
+from typing import Optional
+
+from fastapi import APIRouter, Request, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.database import get_read_db
+from app.http_cache import get_catalog_state
+from app.metrics import max_queries
+from app.templating import render_page
 
 router = APIRouter(include_in_schema=False)
-templates = Jinja2Templates(directory="app/templates")
 
-# Import database dependency inside the route functions to avoid circular imports
+PRODUCTS_PER_PAGE = 24
+
 @router.get("/")
-async def homepage(request: Request):
-    # Lazy import to avoid circular dependencies
-    from app.database import get_db
-    from sqlalchemy.orm.session import Session
-    
-    # We'll add database functionality later
-    return templates.TemplateResponse("index.html", {"request": request})
+@max_queries(4)
+async def homepage(request: Request, db: AsyncSession = Depends(get_read_db)):
+    # Counts and price ranges are stored on the categories and the featured
+    # list is precomputed, so this never aggregates or scans products
+    def load(session):
+        categories, _ = crud.get_categories_page(session, limit=crud.MAX_PAGE_SIZE)
+        return {"categories": categories, "featured": crud.get_featured_products(session)}
+
+    async def load_context():
+        return await db.run_sync(load)
+
+    state = await get_catalog_state(db)
+    return await render_page(request, "index.html", state, load_context)
 
 @router.get("/products")
-async def products_page(request: Request):
-    return templates.TemplateResponse("products.html", {"request": request})
\ No newline at end of file
+@max_queries(3)
+async def products_page(
+    request: Request,
+    category_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    def load(session):
+        categories, _ = crud.get_categories_page(session, limit=crud.MAX_PAGE_SIZE)
+        products, next_cursor = crud.get_products_page(
+            session, category_id=category_id, cursor=cursor, limit=PRODUCTS_PER_PAGE,
+            options=crud.PRODUCT_CARD,
+        )
+        return {
+            "categories": categories,
+            "products": products,
+            "category_id": category_id,
+            "next_cursor": next_cursor,
+        }
+
+    async def load_context():
+        return await db.run_sync(load)
+
+    state = await get_catalog_state(db)
+    try:
+        return await render_page(request, "products.html", state, load_context)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 # Category Schemas
 class CategoryBase(BaseModel):
@@ -10,9 +10,16 @@ class CategoryBase(BaseModel):
 class CategoryCreate(CategoryBase):
     pass
 
+class CategoryUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+
 class CategoryResponse(CategoryBase):
     id: int
     created_at: datetime
+    product_count: int = 0
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -28,15 +35,65 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     pass
 
+class ProductUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    category_id: Optional[int] = None
+    is_featured: Optional[bool] = None
+    image_url: Optional[str] = None
+
+class CategorySummary(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
 class ProductResponse(ProductBase):
     id: int
+    category: Optional[CategorySummary] = None
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, str]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+# Catalog page Schemas
+class CategoryPage(BaseModel):
+    items: List[CategoryResponse]
+    next_cursor: Optional[str] = None
+
+class CategoryFacet(BaseModel):
+    id: int
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: Optional[float] = None  # exclusive; None for the last bucket
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucket]
+
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+    facets: Optional[ProductFacets] = None
+
+# Search Schemas
+class SearchHit(ProductResponse):
+    rank: float
+    name_highlight: str
+    description_highlight: Optional[str] = None
+
+class SearchResults(BaseModel):
+    query: str
+    items: List[SearchHit]
+
 # User Schemas
 class UserBase(BaseModel):
     username: str
@@ -46,6 +103,10 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+class UserUpdate(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -54,6 +115,26 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+# Background job Schemas
+class JobSummary(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: int
+    message: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobResponse(JobSummary):
+    result: Optional[Any] = None
+
 # Authentication Schemas
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,145 @@
+import html
+import re
+from typing import List, Optional
+
+from sqlalchemy.orm.session import Session
+from sqlalchemy.sql.expression import text
+
+from app.crud import PRODUCT_ROW_COLUMNS, product_row_to_dict
+from app.models import Category, Product
+
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 50
+MAX_SEARCH_TERMS = 16
+
+# Private-use characters the database highlighters wrap around matches.
+# They are swapped for <mark> tags after the text has been HTML-escaped.
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_STOP = "\ue001"
+
+_TERM_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+POSTGRES_SEARCH_SQL = """
+WITH q AS (SELECT to_tsquery('simple', :query) AS query),
+hits AS (
+    SELECT p.id, p.name, p.description, ts_rank_cd(p.search_vector, q.query) AS rank
+    FROM products p, q
+    WHERE p.search_vector @@ q.query {category_filter}
+    ORDER BY rank DESC, p.id
+    LIMIT :limit
+)
+SELECT hits.id, hits.rank,
+    ts_headline('simple', hits.name, q.query, :name_options),
+    ts_headline('simple', coalesce(hits.description, ''), q.query, :description_options)
+FROM hits, q
+ORDER BY hits.rank DESC, hits.id
+"""
+
+SQLITE_SEARCH_SQL = """
+SELECT p.id, -bm25(products_fts, 10.0, 1.0) AS rank,
+    highlight(products_fts, 0, :start, :stop),
+    snippet(products_fts, 1, :start, :stop, '…', 24)
+FROM products_fts JOIN products p ON p.id = products_fts.rowid
+WHERE products_fts MATCH :query {category_filter}
+ORDER BY bm25(products_fts, 10.0, 1.0), p.id
+LIMIT :limit
+"""
+
+
+def search_terms(query: str) -> List[str]:
+    """Split free text into lowercase search terms (letters and digits only)"""
+    return [term.lower() for term in _TERM_RE.findall(query)][:MAX_SEARCH_TERMS]
+
+
+def _highlight(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return (
+        html.escape(value)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_STOP, "</mark>")
+    )
+
+
+def _ranked_matches(db: Session, terms: List[str], category_id: Optional[int], limit: int):
+    params = {"limit": limit}
+    category_filter = ""
+    if category_id is not None:
+        category_filter = "AND p.category_id = :category_id"
+        params["category_id"] = category_id
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        selectors = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}"'
+        params.update({
+            # Every term matches as a prefix: "etha buf" finds "ethanol buffer"
+            "query": " & ".join(f"{term}:*" for term in terms),
+            "name_options": f"{selectors}, HighlightAll=true",
+            "description_options": f"{selectors}, MaxFragments=2, MaxWords=24, MinWords=8",
+        })
+        sql = POSTGRES_SEARCH_SQL
+    elif dialect == "sqlite":
+        params.update({
+            "query": " ".join(f'"{term}"*' for term in terms),
+            "start": HIGHLIGHT_START,
+            "stop": HIGHLIGHT_STOP,
+        })
+        sql = SQLITE_SEARCH_SQL
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+    return db.execute(text(sql.format(category_filter=category_filter)), params).fetchall()
+
+
+def search_products(
+    db: Session, query: str, category_id: Optional[int] = None, limit: int = DEFAULT_SEARCH_RESULTS
+) -> List[dict]:
+    """Return SearchHit-shaped dicts for products matching query, best match first,
+    with highlighted name and description"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    matches = _ranked_matches(db, terms, category_id, limit)
+    if not matches:
+        return []
+    rows = {
+        row.id: row
+        for row in db.query(Product)
+        .join(Category, Product.category_id == Category.id)
+        .with_entities(*PRODUCT_ROW_COLUMNS)
+        .filter(Product.id.in_([match[0] for match in matches]))
+    }
+
+    hits = []
+    for product_id, rank, name_highlight, description_highlight in matches:
+        row = rows.get(product_id)
+        if row is None:
+            continue
+        hits.append({
+            **product_row_to_dict(row),
+            "rank": float(rank),
+            "name_highlight": _highlight(name_highlight) or html.escape(row.name),
+            "description_highlight": _highlight(description_highlight),
+        })
+    return hits
+
+
+def rebuild_index(engine) -> str:
+    """Rebuild the full-text index from the products table; returns the dialect.
+
+    Only needed after the index drifted from the table (rows changed with
+    the triggers disabled, a restored dump) or to compact a bloated index.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        # CONCURRENTLY keeps searches and writes going, but cannot run in a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("REINDEX INDEX CONCURRENTLY ix_products_search_vector"))
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+            conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('optimize')"))
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {dialect}")
+    return dialect
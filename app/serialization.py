@@ -0,0 +1,35 @@
+"""
+JSON encoding for API responses. orjson is several times faster than the
+standard library encoder on large catalog pages, and Decimal values (prices)
+are written as exact JSON numbers: 10.50 stays 10.50, not 10.5 or a string.
+"""
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.responses import Response
+
+# Timezone-aware UTC datetimes end in "Z", as pydantic writes them
+OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return orjson.Fragment(str(value))
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the app (see create_app)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_bytes_response(body: bytes, headers: dict = None) -> Response:
+    """Response for a body that is already encoded, e.g. a cached page"""
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,162 @@
+"""
+Startup work shared by the lifespan handler and the gunicorn master: import
+the heavy optional modules, compile templates, open the first database
+connections, and time each step for the startup report.
+
+With gunicorn's preload_app (see gunicorn.conf.py) the import and template
+steps run once in the master, so the workers inherit them copy-on-write and
+only open their own connections.
+"""
+import time
+
+# Taken before any third-party import: app.main imports this module first,
+# so the report covers the application's own import time too
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import gc
+import importlib
+import os
+from contextlib import contextmanager
+
+import anyio.to_thread
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+# Connections opened per worker before it reports ready
+DB_WARM_CONNECTIONS = int(os.getenv("DB_WARM_CONNECTIONS", 2))
+
+# Imported lazily by app.auth / app.images / app.bulk_import on first use
+HEAVY_MODULES = (
+    "passlib.context",
+    "passlib.handlers.bcrypt",
+    "bcrypt",
+    "jose.jwt",
+    "multipart.multipart",
+)
+
+
+class StartupReport:
+    """Durations of the startup phases of this process"""
+
+    def __init__(self, started: float = IMPORT_STARTED):
+        self.started = started
+        self.phases = {}
+        self.preloaded = False
+        self.total = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block; a failing warmup step is reported, never fatal"""
+        info = {}
+        started = time.perf_counter()
+        try:
+            yield info
+        except Exception as e:
+            info["error"] = str(e)
+            print(f"⚠️ Startup step {name} failed: {e}")
+        finally:
+            info["seconds"] = round(time.perf_counter() - started, 4)
+            self.phases[name] = info
+
+    def record_imports(self):
+        """Record module import time, from the first app import to now"""
+        if "imports" not in self.phases:
+            self.phases["imports"] = {"seconds": round(time.perf_counter() - self.started, 4)}
+
+    def ready(self):
+        self.total = round(time.perf_counter() - self.started, 4)
+        from app.metrics import STARTUP_SECONDS
+
+        for name, info in self.phases.items():
+            STARTUP_SECONDS.labels(name).set(info["seconds"])
+        STARTUP_SECONDS.labels("total").set(self.total)
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "preloaded": self.preloaded,
+            "total_seconds": self.total,
+            "phases": self.phases,
+        }
+
+    def log(self):
+        steps = ", ".join(f"{name} {info['seconds']:.3f}s" for name, info in self.phases.items())
+        origin = " (preloaded)" if self.preloaded else ""
+        print(f"⏱️ Worker {os.getpid()} ready in {self.total:.3f}s{origin}: {steps}")
+
+
+report = StartupReport()
+
+
+def import_heavy_modules() -> int:
+    imported = 0
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+            imported += 1
+        except ImportError:
+            pass
+    # Loads the bcrypt backend, which passlib otherwise does on the first hash
+    from app.auth import get_pwd_context
+
+    get_pwd_context().handler().get_backend()
+    return imported
+
+
+def compile_templates() -> int:
+    """Load every template into the shared environment's cache"""
+    from app.assets import load_manifest
+    from app.templating import templates
+
+    names = templates.env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        templates.env.get_template(name)
+    load_manifest()
+    return len(names)
+
+
+async def warm_db_pool(connections: int = DB_WARM_CONNECTIONS) -> dict:
+    """Open the first pooled connections so early requests skip the handshake"""
+    from app.database import async_engine, async_replica_engine, engine
+
+    async def ping(async_engine):
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # The replica takes the catalog reads, the primary auth and sessions
+    async_engines = [e for e in {async_engine, async_replica_engine} if e is not None]
+    if connections > 0:
+        for async_engine in async_engines:
+            # The first connect runs the dialect's one-time setup under a lock
+            # that concurrent greenlets would deadlock on, so open it alone
+            await ping(async_engine)
+            # The rest are held concurrently, otherwise the pool would hand
+            # back the same connection each time
+            await asyncio.gather(*(ping(async_engine) for _ in range(connections - 1)))
+
+    def ping_sync():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    await anyio.to_thread.run_sync(ping_sync)
+    return {
+        "engines": len(async_engines),
+        "connections": connections * len(async_engines),
+        "sync_connections": 1,
+    }
+
+
+def preload():
+    """Run in the gunicorn master before workers are forked"""
+    with report.phase("heavy_imports") as info:
+        info["modules"] = import_heavy_modules()
+    with report.phase("templates") as info:
+        info["templates"] = compile_templates()
+    report.preloaded = True
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.assets import asset_url
+from app.cache import LRUCache
+from app.http_cache import CatalogState, catalog_etag, is_not_modified, not_modified, validator_headers
+
+load_dotenv()
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+TEMPLATE_CACHE_DIR = os.getenv(
+    "TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "biomedis-jinja-cache")
+)
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", 300))
+PAGE_CACHE_STALE_TTL = float(os.getenv("PAGE_CACHE_STALE_TTL", 30))
+is_production = os.getenv("ENVIRONMENT", "development") == "production"
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError as e:
+        print(f"Warning: Jinja bytecode cache disabled: {e}")
+        return None
+
+
+# The one template environment shared by every router. Compiled templates are
+# kept on disk so each gunicorn worker skips parsing; in production templates
+# are not re-checked for changes on every render.
+templates = Jinja2Templates(
+    directory=str(TEMPLATES_DIR),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=not is_production,
+)
+templates.env.globals["asset_url"] = asset_url
+
+# Rendered HTML of anonymous catalog pages. Keys include the catalog
+# version, so any catalog write makes the old pages unreachable; concurrent
+# misses for one page share a single render.
+page_cache = LRUCache(
+    maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL, stale_ttl=PAGE_CACHE_STALE_TTL, name="pages"
+)
+
+
+def is_cacheable(request: Request) -> bool:
+    """Only anonymous GET requests share rendered pages"""
+    return request.method == "GET" and "authorization" not in request.headers
+
+
+async def render_page(
+    request: Request,
+    name: str,
+    state: CatalogState,
+    load_context: Optional[Callable[[], Awaitable[dict]]] = None,
+):
+    """Render a catalog template, serving it from the page cache when possible.
+
+    A matching If-None-Match / If-Modified-Since gets a 304 without
+    rendering, and load_context is only awaited on a cache miss, once for
+    all the concurrent requests for that page.
+    """
+    async def render():
+        context = await load_context() if load_context is not None else {}
+        return templates.get_template(name).render({"request": request, **context})
+
+    if not is_cacheable(request):
+        return HTMLResponse(await render())
+
+    etag = catalog_etag(request, state)
+    if is_not_modified(request, etag, state.updated_at):
+        return not_modified(etag, state.updated_at)
+    key = (
+        name,
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        state.version,
+    )
+    html = await page_cache.get_or_load_async(key, render)
+    return HTMLResponse(html, headers=validator_headers(etag, state.updated_at))
@@ -0,0 +1,6 @@
+"""
+Performance benchmarks. Not collected by pytest; see commands.md.
+
+    python -m benchmarks.load    # HTTP latency/throughput, in-process and through uvicorn
+    python -m benchmarks.micro   # hot helpers timed without the HTTP stack
+"""
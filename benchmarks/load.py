@@ -0,0 +1,255 @@
+"""
+HTTP load benchmark for the catalog, search, template pages, login and
+/health. The app is driven in-process through an ASGI transport and/or
+through a local uvicorn server. Each run reports p50/p95/p99 latency and
+throughput, and is diffed against the stored baseline.
+
+Usage:
+    python -m benchmarks.load [--products 100000] [--categories 500] [--mode both]
+                              [--requests 500] [--concurrency 10] [--cold]
+                              [--save-baseline] [--fail-on-regression]
+
+Needs httpx (pip install -r requirements-dev.txt). Pass --database-url to benchmark
+against Postgres; the default is a SQLite file under benchmarks/.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import report
+
+DEFAULT_DATABASE_URL = f"sqlite:///{(Path(__file__).parent / 'bench.db').resolve()}"
+SCENARIOS = (
+    "health",
+    "categories",
+    "catalog_list",
+    "product_detail",
+    "search",
+    "page_home",
+    "page_products",
+    "login",
+)
+
+
+# Request generators: (rng, context) -> (method, path, params, form data)
+def _health(rng, ctx):
+    return "GET", "/health", None, None
+
+
+def _categories(rng, ctx):
+    return "GET", "/api/categories", {"limit": 100}, None
+
+
+def _catalog_list(rng, ctx):
+    params = {"sort": rng.choice(("newest", "price_asc", "price_desc")), "limit": 50}
+    if rng.random() < 0.5:
+        params["category_id"] = rng.choice(ctx["category_ids"])
+    return "GET", "/api/products", params, None
+
+
+def _product_detail(rng, ctx):
+    return "GET", f"/api/products/{rng.randint(1, ctx['products'])}", None, None
+
+
+def _search(rng, ctx):
+    from benchmarks.seed import WORDS
+
+    q = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 2)))
+    return "GET", "/api/search", {"q": q}, None
+
+
+def _page_home(rng, ctx):
+    return "GET", "/", None, None
+
+
+def _page_products(rng, ctx):
+    params = {"category_id": rng.choice(ctx["category_ids"])} if rng.random() < 0.8 else None
+    return "GET", "/products", params, None
+
+
+def _login(rng, ctx):
+    from benchmarks.seed import BENCH_PASSWORD, BENCH_USERNAME
+
+    return "POST", "/auth/login", None, {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}
+
+
+GENERATORS = {name: globals()[f"_{name}"] for name in SCENARIOS}
+
+
+async def run_scenario(client, name: str, ctx: dict, total: int, concurrency: int, warmup: int, rng_seed: int) -> dict:
+    rng = random.Random(f"{rng_seed}:{name}")
+    requests = [GENERATORS[name](rng, ctx) for _ in range(warmup + total)]
+    latencies = []
+    errors = 0
+
+    async def send(request):
+        method, path, params, data = request
+        started = time.perf_counter()
+        response = await client.request(method, path, params=params, data=data)
+        return response.status_code, time.perf_counter() - started
+
+    for request in requests[:warmup]:
+        await send(request)
+
+    pending = iter(requests[warmup:])
+
+    async def worker():
+        nonlocal errors
+        for request in pending:
+            try:
+                status, elapsed = await send(request)
+            except Exception:
+                errors += 1
+                continue
+            # A 404 for a random product id is still a served request
+            if status >= 500 or (status >= 400 and status != 404):
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report.summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run_all(client, scenarios, ctx: dict, args) -> dict:
+    results = {}
+    for name in scenarios:
+        total = args.login_requests if name == "login" else args.requests
+        print(f"  ⏱️ {name} ({total} requests, concurrency {args.concurrency})")
+        results[name] = await run_scenario(
+            client, name, ctx, total, args.concurrency, args.warmup, args.seed
+        )
+    return results
+
+
+async def run_asgi(scenarios, ctx: dict, args) -> dict:
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_all(client, scenarios, ctx, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(scenarios, ctx: dict, args) -> dict:
+    import httpx
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+        ],
+        env=os.environ.copy(),
+        cwd=str(Path(__file__).parent.parent),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+            return await run_all(client, scenarios, ctx, args)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def configure_environment(args):
+    """Point the app at the benchmark database before any app module is imported"""
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    # Keep a previous multiprocess metrics directory from leaking into the run
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    # The login scenario replays one user far beyond the login limits
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    if args.cold:
+        for name in ("CATALOG_CACHE_SIZE", "PAGE_CACHE_SIZE", "USER_CACHE_SIZE"):
+            os.environ[name] = "0"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog HTTP load benchmark")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=500)
+    parser.add_argument("--reset", action="store_true", help="drop and reseed the benchmark database")
+    parser.add_argument("--mode", choices=("asgi", "uvicorn", "both"), default="both")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=50, help="measured requests for login (bcrypt bound)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cold", action="store_true", help="disable the catalog, page and user caches")
+    report.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    configure_environment(args)
+    from benchmarks.seed import seed
+
+    print(f"🌱 Seeding {args.products} products in {args.categories} categories ({args.database_url.split('@')[-1]})")
+    seeded = seed(products=args.products, categories=args.categories, rng_seed=args.seed, reset=args.reset)
+    if seeded["reused"]:
+        print("   reusing the existing benchmark data")
+    else:
+        print(f"   seeded in {seeded['seconds']}s")
+
+    ctx = {"products": args.products, "category_ids": list(range(1, args.categories + 1))}
+    modes = ("asgi", "uvicorn") if args.mode == "both" else (args.mode,)
+    results = {}
+    for mode in modes:
+        print(f"\n🚀 {mode}")
+        runner = run_asgi if mode == "asgi" else run_uvicorn
+        for name, summary in asyncio.run(runner(scenarios, ctx, args)).items():
+            results[f"{mode}/{name}"] = summary
+
+    config = {
+        "dialect": args.database_url.split(":", 1)[0],
+        "products": args.products,
+        "categories": args.categories,
+        "requests": args.requests,
+        "login_requests": args.login_requests,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "cold": args.cold,
+    }
+    print()
+    return report.finish("load", results, config, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
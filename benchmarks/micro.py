@@ -0,0 +1,140 @@
+"""
+Micro-benchmarks for the hot helpers behind the catalog pages, timed
+without the HTTP stack: keyset queries, search, schema serialization,
+template rendering, cursors, the LRU cache and password hashing.
+
+Usage:
+    python -m benchmarks.micro [--products 100000] [--categories 500] [--seconds 1.0]
+                               [--only catalog_page,search] [--save-baseline]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks import report
+from benchmarks.load import DEFAULT_DATABASE_URL
+
+
+def measure(fn, seconds: float, min_calls: int = 5, warmup: int = 3) -> dict:
+    """Call fn repeatedly for about `seconds` and summarize per-call latency"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + seconds
+    while len(latencies) < min_calls or time.perf_counter() < deadline:
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return report.summarize(latencies, time.perf_counter() - started)
+
+
+def build_benchmarks(db, args) -> dict:
+    """name -> zero-argument callable; db is a session on the seeded catalog"""
+    from app import crud, search
+    from app.auth import get_password_hash, verify_password
+    from app.cache import LRUCache
+    from app.schemas import ProductPage
+    from app.serialization import dumps
+    from app.templating import templates
+    from benchmarks.seed import WORDS
+
+    rng = random.Random(args.seed)
+    category_ids = list(range(1, args.categories + 1))
+
+    first_page, cursor = crud.get_products_page(db, limit=50)
+    big_page, big_cursor = crud.get_products_page(db, limit=crud.MAX_PAGE_SIZE)
+    big_rows, _ = crud.get_product_rows_page(db, limit=crud.MAX_PAGE_SIZE)
+    page_model = ProductPage.model_validate({"items": first_page, "next_cursor": cursor})
+    categories, _ = crud.get_categories_page(db, limit=crud.MAX_PAGE_SIZE)
+    grid, grid_cursor = crud.get_products_page(db, limit=24)
+    template = templates.get_template("products.html")
+
+    cache = LRUCache(maxsize=1024, ttl=60)
+    keys = [("products", i, "newest", None, 50) for i in range(1024)]
+    for key in keys:
+        cache.set(key, page_model)
+
+    hashed = get_password_hash("bench-password")
+
+    return {
+        "catalog_page": lambda: crud.get_products_page(
+            db, category_id=rng.choice(category_ids), sort=rng.choice(tuple(crud.PRODUCT_SORTS)), limit=50
+        ),
+        "catalog_page_deep": lambda: crud.get_products_page(db, cursor=cursor, limit=50),
+        "category_list": lambda: crud.get_categories_page(db, limit=100),
+        "product_by_id": lambda: crud.get_product(db, rng.randint(1, args.products)),
+        "search": lambda: search.search_products(db, " ".join(rng.sample(WORDS, rng.randint(1, 2)))),
+        "serialize_page": lambda: ProductPage.model_validate(
+            {"items": first_page, "next_cursor": cursor}
+        ).model_dump_json(),
+        # 500-item pages: ORM objects + ProductPage vs Row dicts + orjson
+        "serialize_page_500": lambda: ProductPage.model_validate(
+            {"items": big_page, "next_cursor": big_cursor}
+        ).model_dump_json(),
+        "serialize_rows_500": lambda: dumps({"items": big_rows, "next_cursor": big_cursor}),
+        "catalog_page_500": lambda: crud.get_products_page(db, limit=crud.MAX_PAGE_SIZE),
+        "catalog_rows_500": lambda: crud.get_product_rows_page(db, limit=crud.MAX_PAGE_SIZE),
+        "render_products_html": lambda: template.render({
+            "request": None,
+            "categories": categories,
+            "products": grid,
+            "category_id": None,
+            "next_cursor": grid_cursor,
+        }),
+        "cursor_roundtrip": lambda: crud.decode_cursor(
+            crud.encode_cursor("newest", first_page[-1].created_at, first_page[-1].id), "newest"
+        ),
+        "lru_cache_hit": lambda: cache.get(rng.choice(keys)),
+        "verify_password": lambda: verify_password("bench-password", hashed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog micro-benchmarks")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=500)
+    parser.add_argument("--reset", action="store_true", help="drop and reseed the benchmark database")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each benchmark")
+    parser.add_argument("--only", help="comma-separated subset of benchmarks")
+    parser.add_argument("--seed", type=int, default=42)
+    report.add_baseline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    from app.database import SessionLocal
+    from benchmarks.seed import seed
+
+    print(f"🌱 Seeding {args.products} products in {args.categories} categories")
+    seed(products=args.products, categories=args.categories, rng_seed=args.seed, reset=args.reset)
+
+    db = SessionLocal()
+    try:
+        benchmarks = build_benchmarks(db, args)
+        selected = [name.strip() for name in args.only.split(",")] if args.only else list(benchmarks)
+        unknown = set(selected) - set(benchmarks)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        results = {}
+        for name in selected:
+            print(f"  ⏱️ {name}")
+            results[name] = measure(benchmarks[name], args.seconds)
+    finally:
+        db.close()
+
+    config = {
+        "dialect": args.database_url.split(":", 1)[0],
+        "products": args.products,
+        "categories": args.categories,
+    }
+    print()
+    return report.finish("micro", results, config, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
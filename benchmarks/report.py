@@ -0,0 +1,167 @@
+"""
+Latency summaries, result files and baseline comparison shared by the
+load and micro benchmarks.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINES_DIR = BENCH_DIR / "baselines"
+
+# Metrics compared against the baseline: name -> True when higher is better
+COMPARED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "rps": True}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> dict:
+    """Summary of per-operation latencies (seconds) measured over wall_seconds"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": round(count / wall_seconds, 1) if wall_seconds else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BENCH_DIR
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(kind: str, results: dict, config: dict) -> Path:
+    """Save a run under benchmarks/results/ and return its path"""
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = RESULTS_DIR / f"{kind}-{stamp}.json"
+    path.write_text(json.dumps({"env": environment(), "config": config, "results": results}, indent=2))
+    return path
+
+
+def baseline_path(kind: str, name: Optional[str] = None) -> Path:
+    return BASELINES_DIR / f"{name or kind}.json"
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(path: Path, results: dict, config: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"env": environment(), "config": config, "results": results}, indent=2))
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """Per-benchmark relative change against the baseline for every COMPARED metric.
+
+    A change is a regression when it is worse than the baseline by more
+    than threshold (0.10 = 10%).
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def print_table(results: Dict[str, dict]):
+    header = f"{'benchmark':<28} {'count':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<28} {r['count']:>7} {r['errors']:>5} {r['rps']:>9} "
+            f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}"
+        )
+
+
+def print_comparison(rows: List[dict], threshold: float) -> int:
+    """Print the baseline diff and return the number of regressions"""
+    if not rows:
+        print("No comparable baseline entries")
+        return 0
+    regressions = 0
+    print(f"\nAgainst baseline (regression threshold {threshold:.0%}):")
+    for row in rows:
+        flag = "❌" if row["regression"] else "  "
+        regressions += row["regression"]
+        print(
+            f"{flag} {row['benchmark']:<28} {row['metric']:<7} "
+            f"{row['baseline']:>10} -> {row['current']:>10} ({row['change']:+.1%})"
+        )
+    return regressions
+
+
+def finish(kind: str, results: dict, config: dict, args) -> int:
+    """Common tail of a benchmark run: print, save, diff against the baseline"""
+    print_table(results)
+    path = write_results(kind, results, config)
+    print(f"\n📝 Results written to {path}")
+
+    baseline_file = baseline_path(kind, args.baseline)
+    regressions = 0
+    baseline = load_baseline(baseline_file)
+    if baseline is not None:
+        if baseline.get("config") != config:
+            print(f"⚠️ Baseline {baseline_file.name} was recorded with a different configuration")
+        rows = compare(results, baseline.get("results", {}), args.threshold)
+        regressions = print_comparison(rows, args.threshold)
+    if args.save_baseline:
+        save_baseline(baseline_file, results, config)
+        print(f"📌 Baseline saved to {baseline_file}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def add_baseline_arguments(parser):
+    parser.add_argument("--baseline", help="baseline name under benchmarks/baselines/ (default: the benchmark kind)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is found")
@@ -0,0 +1,97 @@
+"""
+Synthetic catalog for benchmarks: categories, products with searchable
+descriptions and a login user. Deterministic for a given seed.
+
+Import this module only after DATABASE_URL points at the benchmark database.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app import crud
+from app.auth import get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.models import Category, Product, User
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+INSERT_BATCH_SIZE = 5000
+
+WORDS = (
+    "microscope", "centrifugeuse", "pipette", "réactif", "incubateur", "spectrophotomètre",
+    "balance", "agitateur", "autoclave", "tube", "gants", "bécher", "éprouvette", "thermomètre",
+    "hotte", "étuve", "sonde", "filtre", "seringue", "lame", "lamelle", "colorant", "tampon",
+    "solution", "anticorps", "enzyme", "culture", "milieu", "gélose", "boîte", "pétri", "cuvette",
+    "électrode", "pH", "mètre", "réfrigérateur", "congélateur", "vortex", "bain", "marie",
+    "stérile", "jetable", "verre", "plastique", "inox", "numérique", "optique", "binoculaire",
+    "trinoculaire", "fluorescence", "objectif", "oculaire", "platine", "condenseur", "laser",
+    "PCR", "thermocycleur", "électrophorèse", "gel", "agarose", "marqueur", "kit", "extraction",
+)
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def catalog_size(db) -> tuple:
+    return db.query(func.count(Category.id)).scalar(), db.query(func.count(Product.id)).scalar()
+
+
+def seed(products: int = 100_000, categories: int = 500, rng_seed: int = 42, reset: bool = False) -> dict:
+    """Create (or reuse) a catalog of the requested size and return a summary"""
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    db = SessionLocal()
+    try:
+        if catalog_size(db) == (categories, products) and db.query(User).filter_by(username=BENCH_USERNAME).first():
+            return {"categories": categories, "products": products, "seconds": 0.0, "reused": True}
+        if any(catalog_size(db)):
+            raise RuntimeError("Benchmark database holds a different catalog; pass --reset")
+
+        started = time.perf_counter()
+        rng = random.Random(rng_seed)
+        db.execute(Category.__table__.insert(), [
+            {"name": f"Catégorie {i:04d} {rng.choice(WORDS)}", "description": _sentence(rng, 8)}
+            for i in range(categories)
+        ])
+        category_ids = [row[0] for row in db.query(Category.id).order_by(Category.id)]
+
+        now = datetime.now(timezone.utc)
+        batch = []
+        for i in range(products):
+            batch.append({
+                "name": f"{_sentence(rng, 2).capitalize()} {i:06d}",
+                "description": _sentence(rng, rng.randint(10, 40)),
+                "price": Decimal(rng.randint(100, 500_000)) / 100,
+                "is_featured": rng.random() < 0.02,
+                "category_id": rng.choice(category_ids),
+                "created_at": now - timedelta(seconds=rng.randint(0, 3 * 365 * 86400)),
+            })
+            if len(batch) >= INSERT_BATCH_SIZE:
+                db.execute(Product.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.execute(Product.__table__.insert(), batch)
+        crud.refresh_category_stats(db, category_ids)
+        crud.refresh_featured(db)
+
+        db.add(User(
+            username=BENCH_USERNAME,
+            email="bench@example.com",
+            hashed_password=get_password_hash(BENCH_PASSWORD),
+            role="user",
+        ))
+        db.commit()
+        return {
+            "categories": categories,
+            "products": products,
+            "seconds": round(time.perf_counter() - started, 2),
+            "reused": False,
+        }
+    finally:
+        db.close()
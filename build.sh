@@ -7,6 +7,10 @@ echo "🚀 Starting build process..."
 echo "📦 Installing Python dependencies..."
 pip install -r requirements.txt
 
+# Fingerprint and precompress static assets
+echo "🎨 Building static assets..."
+python -m app.assets
+
 # Run database migrations
 echo "🗄️ Running database migrations..."
 alembic upgrade head
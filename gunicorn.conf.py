@@ -0,0 +1,31 @@
+# gunicorn.conf.py - loaded automatically by gunicorn from the working directory
+# (command-line flags in start.sh / render.yaml still take precedence)
+
+# Import the app once in the master; forked workers share its memory
+# copy-on-write instead of each importing and compiling everything again
+preload_app = True
+
+
+def when_ready(server):
+    """Master, after the app is loaded and before the workers are forked"""
+    if server.cfg.preload_app:
+        from app.startup import preload
+
+        preload()
+
+
+def post_fork(server, worker):
+    """Never share pooled database connections across processes"""
+    from app.database import async_engine, async_replica_engine, engine, replica_engine
+
+    for each in {engine, replica_engine}:
+        each.dispose(close=False)
+    for each in {async_engine, async_replica_engine} - {None}:
+        each.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of a worker that exited so /metrics stops counting it"""
+    from app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
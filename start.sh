@@ -7,6 +7,23 @@ echo "🚀 Starting Biomedis api..."
 echo "🗄️ Checking for database migrations..."
 alembic upgrade head
 
+# Share catalog and user cache invalidations between the gunicorn workers
+export CATALOG_CACHE_VERSION_FILE="${CATALOG_CACHE_VERSION_FILE:-/tmp/biomedis-catalog.version}"
+export USER_CACHE_VERSION_FILE="${USER_CACHE_VERSION_FILE:-/tmp/biomedis-users.version}"
+
+# Prometheus metrics are aggregated across workers through this directory;
+# samples left by a previous run must not be counted again
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/biomedis-metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Login rate limits are shared by all workers through this SQLite file
+export RATE_LIMIT_BACKEND="${RATE_LIMIT_BACKEND:-sqlite}"
+export RATE_LIMIT_SQLITE_PATH="${RATE_LIMIT_SQLITE_PATH:-/tmp/biomedis-ratelimit.db}"
+
+# Worker count; app/database.py sizes each worker's connection pools from it
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-4}"
+
 # Start the application
 echo "🌐 Starting server..."
-exec gunicorn app.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:10000
\ No newline at end of file
+exec gunicorn app.main:app --workers "$WEB_CONCURRENCY" --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:10000
\ No newline at end of file
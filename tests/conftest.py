@@ -0,0 +1,115 @@
+"""
+Shared setup of the pytest suite: a throwaway SQLite database built from the
+models, configured before any app module reads the environment.
+"""
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="biomedis-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+# Fail any request that goes over its route's query budget
+os.environ["SQL_QUERY_GUARD"] = "raise"
+# The rate limiter is tested with its own rules (tests/test_ratelimit.py)
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+# Jobs are run explicitly by tests/test_jobs.py
+os.environ["JOB_WORKERS"] = "0"
+os.environ["JOB_DIR"] = os.path.join(TEST_DIR, "jobs")
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+os.environ.pop("CATALOG_CACHE_VERSION_FILE", None)
+os.environ.pop("DATABASE_REPLICA_URL", None)
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app import models  # noqa: F401  registers the tables
+    from app.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture(scope="session")
+def catalog(database):
+    """Three categories of 20 products; every fifth product featured"""
+    from app import crud
+    from app.database import SessionLocal
+    from app.schemas import CategoryCreate, ProductCreate
+
+    db = SessionLocal()
+    try:
+        categories = [crud.create_category(db, CategoryCreate(name=f"Category {n}")) for n in range(3)]
+        for category in categories:
+            for n in range(20):
+                crud.create_product(db, ProductCreate(
+                    name=f"{category.name} product {n}",
+                    description=f"Reagent number {n}",
+                    price=f"{n * 25 + 10}.50",
+                    category_id=category.id,
+                    is_featured=n % 5 == 0,
+                ))
+        return {"category_ids": [category.id for category in categories]}
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    """Every test starts from cold caches"""
+    from app.cache import catalog_cache
+    from app.templating import page_cache
+
+    catalog_cache.invalidate()
+    page_cache.invalidate()
+    yield
+
+
+@pytest.fixture(scope="session")
+def admin_headers(database):
+    from app.auth import create_access_token
+    from app.database import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        db.add(User(username="admin", email="admin@example.com", hashed_password="x", role="admin"))
+        db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+
+@pytest.fixture
+def scratch_category(catalog):
+    """A category of its own for tests that write products; removed with them afterwards"""
+    from app import crud
+    from app.cache import catalog_cache
+    from app.database import SessionLocal
+    from app.models import Category, Product
+    from app.schemas import CategoryCreate
+
+    db = SessionLocal()
+    try:
+        category = crud.create_category(db, CategoryCreate(name="Scratch"))
+        yield category.id
+        db.query(Product).filter(Product.category_id == category.id).delete(synchronize_session=False)
+        db.query(Category).filter(Category.id == category.id).delete(synchronize_session=False)
+        crud.refresh_featured(db)
+        crud.touch_catalog(db)
+        db.commit()
+        catalog_cache.invalidate()
+    finally:
+        db.close()
@@ -0,0 +1,29 @@
+"""
+Static asset build: fingerprinting, and the runtime directories it leaves alone.
+"""
+import json
+
+from app.assets import build_assets
+
+
+def test_build_skips_uploads_and_previous_output(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text("body { color: black; }\n" * 20)
+    (static / "uploads" / "products" / "1").mkdir(parents=True)
+    (static / "uploads" / "products" / "1" / "thumb.webp").write_bytes(b"RIFF")
+    (static / "uploads" / "notes.txt").write_text("runtime")
+    (static / "dist").mkdir()
+    (static / "dist" / "stale.css").write_text("old build")
+    # Only the top-level runtime directories are skipped
+    (static / "images" / "uploads").mkdir(parents=True)
+    (static / "images" / "uploads" / "icon.svg").write_text("<svg/>")
+
+    manifest = build_assets(static, static / "dist")
+
+    assert sorted(manifest) == ["css/site.css", "images/uploads/icon.svg"]
+    hashed = static / "dist" / manifest["css/site.css"]
+    assert hashed.read_text() == (static / "css" / "site.css").read_text()
+    assert (hashed.parent / (hashed.name + ".gz")).exists()
+    assert not (static / "dist" / "stale.css").exists()
+    assert json.loads((static / "dist" / "manifest.json").read_text()) == manifest
@@ -0,0 +1,126 @@
+"""
+Bulk import: CSV and NDJSON rows upserted by product name, with per-row
+errors, and an export of the catalog imported back unchanged.
+"""
+import json
+from decimal import Decimal
+
+import pytest
+
+from app import bulk_export, bulk_import
+from app.database import SessionLocal
+from app.models import Product
+
+
+@pytest.fixture
+def db(database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def run_import(db, text: str, fmt: str, chunk_size: int = 7, batch_size: int = 1000):
+    """Import text split into small chunks, so lines and characters straddle them"""
+    data = text.encode()
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    return bulk_import.import_stream(db, chunks, fmt, batch_size=batch_size).to_dict()
+
+
+def products(db, category_id):
+    db.expire_all()
+    return {
+        product.name: product
+        for product in db.query(Product).filter(Product.category_id == category_id)
+    }
+
+
+@pytest.mark.parametrize("chunks, lines", [
+    ([b"a\r\nb\n", b"c"], ["a\n", "b\n", "c"]),
+    # A byte order mark, U+2028 and a form feed are not line breaks
+    (["\ufeffone\u2028".encode(), b"line\x0c\n"], ["one\u2028line\x0c\n"]),
+    # A multi-byte character split across chunks
+    ([b"caf\xc3", b"\xa9\n"], ["café\n"]),
+])
+def test_lines_end_only_at_line_feeds(chunks, lines):
+    assert list(bulk_import.iter_lines(chunks)) == lines
+
+
+def test_csv_rows_are_upserted_by_name(db, scratch_category):
+    csv_text = (
+        "name,description,price,category_id,is_featured\r\n"
+        f"Buffer A,\"Tris\u2028buffer, 1 L\",12.50,{scratch_category},true\r\n"
+        f"Buffer B,,3.10,{scratch_category},\r\n"
+    )
+    report = run_import(db, csv_text, "csv")
+    assert (report["rows"], report["upserted"], report["failed"]) == (2, 2, 0)
+    imported = products(db, scratch_category)
+    assert imported["Buffer A"].description == "Tris\u2028buffer, 1 L"
+    assert imported["Buffer A"].price == Decimal("12.50")
+    assert imported["Buffer A"].is_featured is True
+    assert imported["Buffer B"].is_featured is False
+
+    first_id = imported["Buffer A"].id
+    report = run_import(db, f"name,price,category_id\nBuffer A,14.00,{scratch_category}\n", "csv")
+    assert report["upserted"] == 1
+    imported = products(db, scratch_category)
+    assert len(imported) == 2
+    assert (imported["Buffer A"].id, imported["Buffer A"].price) == (first_id, Decimal("14.00"))
+
+
+def test_csv_errors_are_reported_per_line(db, scratch_category):
+    csv_text = (
+        "name,description,price,category_id\n"
+        f"Gel,\"Agarose\u2028gel\",8.00,{scratch_category}\n"
+        f"Pipette,,not a price,{scratch_category}\n"
+        "Flask,,5.00,999999\n"
+        f"Plate,,2.00,{scratch_category}\n"
+    )
+    report = run_import(db, csv_text, "csv")
+    assert (report["rows"], report["upserted"], report["failed"]) == (4, 2, 2)
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+    assert report["errors"][0]["errors"][0]["loc"] == ("price",)
+    assert report["errors"][1]["errors"] == "Category 999999 does not exist"
+    assert set(products(db, scratch_category)) == {"Gel", "Plate"}
+
+
+def test_ndjson_rows_and_errors(db, scratch_category):
+    ndjson = "\n".join([
+        json.dumps({"name": "Tube", "price": "0.10", "category_id": scratch_category}),
+        "",
+        "{not json",
+        "[1, 2]",
+        json.dumps({"name": "Rack", "description": "Holds\u2028tubes", "price": 4, "category_id": scratch_category},
+                   ensure_ascii=False),
+    ]) + "\n"
+    report = run_import(db, ndjson, "ndjson", batch_size=2)
+    assert (report["rows"], report["upserted"], report["failed"]) == (4, 2, 2)
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+    assert report["errors"][0]["errors"].startswith("Invalid JSON")
+    assert report["errors"][1]["errors"] == "Expected a JSON object"
+    assert len(report["batches"]) == 2
+    imported = products(db, scratch_category)
+    assert imported["Tube"].price == Decimal("0.10")
+    assert imported["Rack"].description == "Holds\u2028tubes"
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_imports_back_unchanged(db, scratch_category, fmt):
+    source = (
+        "name,description,price,category_id,is_featured\n"
+        f"Round trip 1,\"Line\u2028separator, quotes \"\"and\"\" commas\",0.10,{scratch_category},true\n"
+        f"Round trip 2,,123456.78,{scratch_category},false\n"
+    )
+    assert run_import(db, source, "csv")["upserted"] == 2
+    columns = bulk_import.UPSERT_COLUMNS
+    before = {name: [getattr(product, column) for column in columns] for name, product in products(db, scratch_category).items()}
+
+    exported = b"".join(bulk_export.export_catalog(SessionLocal, fmt)).decode()
+    db.query(Product).filter(Product.category_id == scratch_category).delete()
+    db.commit()
+    report = run_import(db, exported, fmt, chunk_size=4096)
+    assert report["failed"] == 0
+
+    after = {name: [getattr(product, column) for column in columns] for name, product in products(db, scratch_category).items()}
+    assert after == before
@@ -0,0 +1,132 @@
+"""
+LRUCache.get_or_load_async: single-flight loads, stale-while-revalidate and
+a waiter taking over from a cancelled load.
+"""
+import asyncio
+
+import pytest
+
+from app.cache import LRUCache
+
+
+class Loader:
+    """Coroutine loader that blocks until released and counts its calls"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        return self.value
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = LRUCache(name="test")
+        loader = Loader("page")
+        tasks = [asyncio.create_task(cache.get_or_load_async("key", loader)) for _ in range(5)]
+        await loader.started.wait()
+        await asyncio.sleep(0)
+        loader.release.set()
+        assert await asyncio.gather(*tasks) == ["page"] * 5
+        assert loader.calls == 1
+        assert cache.coalesced == 4
+        assert await cache.get_or_load_async("key", Loader("reloaded")) == "page"
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_while_one_request_refreshes_it():
+    async def scenario():
+        cache = LRUCache(name="test", stale_ttl=60)
+        cache.set("key", "old", ttl=0)
+        loader = Loader("new")
+        refresh = asyncio.create_task(cache.get_or_load_async("key", loader))
+        await loader.started.wait()
+
+        assert await cache.get_or_load_async("key", Loader("unused")) == "old"
+        assert cache.stale_hits == 1
+        loader.release.set()
+        assert await refresh == "new"
+        assert loader.calls == 1
+        assert cache.get("key") == "new"
+
+    asyncio.run(scenario())
+
+
+def test_invalidated_stale_entry_is_not_served():
+    async def scenario():
+        cache = LRUCache(name="test", stale_ttl=60)
+        cache.set("key", "old", ttl=0)
+        cache.invalidate()
+        loader = Loader("new")
+        loader.release.set()
+        assert await cache.get_or_load_async("key", loader) == "new"
+
+    asyncio.run(scenario())
+
+
+def test_waiter_takes_over_when_the_leading_load_is_cancelled():
+    async def scenario():
+        cache = LRUCache(name="test")
+        leader_loader = Loader("leader")
+        leader = asyncio.create_task(cache.get_or_load_async("key", leader_loader))
+        await leader_loader.started.wait()
+        waiter_loader = Loader("waiter")
+        waiter = asyncio.create_task(cache.get_or_load_async("key", waiter_loader))
+        await asyncio.sleep(0)
+        assert cache.coalesced == 1
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await waiter_loader.started.wait()
+        waiter_loader.release.set()
+        assert await waiter == "waiter"
+        assert cache.get("key") == "waiter"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_load():
+    async def scenario():
+        cache = LRUCache(name="test")
+        loader = Loader("page")
+        leader = asyncio.create_task(cache.get_or_load_async("key", loader))
+        await loader.started.wait()
+        waiter = asyncio.create_task(cache.get_or_load_async("key", Loader("unused")))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        loader.release.set()
+        assert await leader == "page"
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        cache = LRUCache(name="test")
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def failing():
+            started.set()
+            await release.wait()
+            raise RuntimeError("database down")
+
+        tasks = [asyncio.create_task(cache.get_or_load_async("key", failing)) for _ in range(3)]
+        await started.wait()
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.get("key") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,111 @@
+"""
+CompressionMiddleware: what gets compressed, and the responses it must
+leave alone (304, 206, HEAD, small bodies).
+"""
+import gzip
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import COMPRESSION_MIN_SIZE, CompressionMiddleware
+
+BODY = b"catalog line\n" * (COMPRESSION_MIN_SIZE // 4)
+ETAG = '"abc123"'
+
+
+@pytest.fixture
+def compressed_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.api_route("/large", methods=["GET", "HEAD"])
+    def large():
+        return PlainTextResponse(BODY, headers={"ETag": ETAG})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse(b"ok")
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304, headers={"ETag": ETAG})
+
+    @app.get("/partial")
+    def partial():
+        return PlainTextResponse(BODY, status_code=206, headers={"Content-Range": f"bytes 0-{len(BODY) - 1}/*"})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BODY, BODY]), media_type="text/csv")
+
+    return TestClient(app)
+
+
+def gzipped(response):
+    """Raw bytes as sent: the test client would otherwise decode them"""
+    return b"".join(response.iter_raw())
+
+
+def test_large_text_is_gzipped_with_a_weak_etag(compressed_client):
+    with compressed_client.stream("GET", "/large", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = gzipped(response)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == f"W/{ETAG}"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw) == BODY
+
+
+def test_streams_are_compressed_chunk_by_chunk(compressed_client):
+    with compressed_client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = gzipped(response)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw) == BODY * 2
+
+
+def test_uncompressed_without_accept_encoding(compressed_client):
+    response = compressed_client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == ETAG
+    assert response.content == BODY
+
+
+def test_small_bodies_are_sent_as_is(compressed_client):
+    response = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content == b"ok"
+
+
+def test_not_modified_is_not_compressed(compressed_client):
+    response = compressed_client.get("/not-modified", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == ETAG
+
+
+def test_not_modified_echoes_the_weak_etag_it_was_asked_about(compressed_client):
+    response = compressed_client.get(
+        "/not-modified", headers={"Accept-Encoding": "gzip", "If-None-Match": f"W/{ETAG}"}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == f"W/{ETAG}"
+
+
+def test_partial_content_is_not_compressed(compressed_client):
+    with compressed_client.stream("GET", "/partial", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = gzipped(response)
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert raw == BODY
+
+
+def test_head_is_not_compressed(compressed_client):
+    response = compressed_client.head("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(len(BODY))
+    assert response.headers["etag"] == ETAG
@@ -0,0 +1,96 @@
+"""
+Health probes. The test schema is built with metadata.create_all, so it
+has no alembic_version table until a test adds one.
+"""
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import text
+
+from app import health
+from app.database import engine
+
+
+@pytest.fixture
+def fresh_probe():
+    health.health_cache.invalidate()
+    yield
+    health.health_cache.invalidate()
+
+
+@pytest.fixture
+def stamped(database):
+    """An alembic_version table stamped with the given revisions"""
+    def stamp(*revisions):
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+            conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+            for revision in revisions:
+                conn.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": revision})
+
+    yield stamp
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+
+def test_liveness_touches_no_database(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json()["status"] == "alive"
+
+
+def test_not_ready_without_alembic_version(client, fresh_probe):
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.headers["cache-control"] == "no-store"
+    report = response.json()
+    assert report["status"] == "unavailable"
+    assert report["checks"]["database"]["ok"]
+    migrations = report["checks"]["migrations"]
+    assert (migrations["ok"], migrations["current"]) == (False, [])
+    assert migrations["head"] == list(health.migration_heads())
+
+
+def test_not_ready_behind_the_head_revision(client, fresh_probe, stamped):
+    stamped("0000000000")
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["migrations"]["current"] == ["0000000000"]
+
+
+def test_ready_at_the_head_revision(client, fresh_probe, stamped):
+    stamped(*health.migration_heads())
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == "ready"
+    assert all(check["ok"] for check in report["checks"].values())
+
+
+def test_readiness_checks_are_cached(client, fresh_probe, stamped):
+    assert client.get("/health/ready").status_code == 503
+    stamped(*health.migration_heads())
+    # Still the cached report until the cache expires
+    assert client.get("/health/ready").status_code == 503
+    health.health_cache.invalidate()
+    assert client.get("/health/ready").status_code == 200
+
+
+def test_exhausted_pool_answers_503_without_running_the_checks(client, fresh_probe, monkeypatch):
+    pool = QueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0)
+    monkeypatch.setattr(health, "_engines", lambda: {"sync": SimpleNamespace(pool=pool)})
+    assert health.pool_usage(pool)["exhausted"] is False
+
+    connection = pool.connect()
+    try:
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        report = response.json()
+        assert report["reason"] == "connection pool exhausted: sync"
+        assert report["pools"]["sync"]["saturation"] == 1.0
+        assert "checks" not in report
+    finally:
+        connection.close()
+    pool.dispose()
@@ -0,0 +1,134 @@
+"""
+Background job queue: claiming, lease recovery and retries. The conftest
+sets JOB_WORKERS=0, so jobs only run when a test drives them.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from app import jobs
+from app.database import SessionLocal
+from app.models import Job
+
+
+@pytest.fixture
+def db(database):
+    session = SessionLocal()
+    session.query(Job).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    """Job kind "flaky": fails with the queued errors, then returns its payload"""
+    errors = []
+
+    def handler(job, **payload):
+        if errors:
+            raise errors.pop(0)
+        return {"attempt": job.attempt, **payload}
+
+    monkeypatch.setitem(jobs.HANDLERS, "flaky", jobs.JobHandler(handler, 2))
+    return errors
+
+
+def reload(db, job_id):
+    db.expire_all()
+    return db.get(Job, job_id)
+
+
+def run(db, worker_id="worker-1"):
+    """Claim the next job and run it as a job loop would"""
+    job = jobs.claim_job(db, worker_id)
+    assert job is not None
+    asyncio.run(jobs.JobRunner(workers=0)._run(job, worker_id))
+    return reload(db, job.id)
+
+
+def make_due(db, job_id):
+    db.query(Job).filter(Job.id == job_id).update({Job.run_after: jobs.utcnow()})
+    db.commit()
+
+
+def test_each_job_is_claimed_by_one_worker_in_order(db, flaky):
+    first = jobs.enqueue(db, "flaky", {"n": 1})
+    second = jobs.enqueue(db, "flaky", {"n": 2})
+    jobs.enqueue(db, "flaky", {"n": 3}, delay=3600)
+
+    claimed = jobs.claim_job(db, "worker-1")
+    assert claimed.id == first.id
+    assert (claimed.status, claimed.locked_by, claimed.attempts) == (jobs.RUNNING, "worker-1", 1)
+    assert jobs.claim_job(db, "worker-2").id == second.id
+    # The delayed job is not due yet
+    assert jobs.claim_job(db, "worker-3") is None
+
+
+def test_unknown_kinds_are_not_queued(db):
+    with pytest.raises(ValueError):
+        jobs.enqueue(db, "no-such-kind")
+
+
+def test_abandoned_job_is_requeued_and_its_old_worker_fenced_out(db, flaky):
+    job = jobs.enqueue(db, "flaky")
+    jobs.claim_job(db, "worker-1")
+    assert jobs.requeue_abandoned(db, lease=60) == 0
+
+    db.query(Job).filter(Job.id == job.id).update({Job.heartbeat_at: jobs.utcnow() - timedelta(seconds=120)})
+    db.commit()
+    assert jobs.requeue_abandoned(db, lease=60) == 1
+    assert reload(db, job.id).status == jobs.QUEUED
+    assert not jobs.update_job(job.id, "worker-1", {Job.progress: 50})
+
+    retaken = jobs.claim_job(db, "worker-2")
+    assert (retaken.id, retaken.attempts) == (job.id, 2)
+    assert jobs.update_job(job.id, "worker-2", {Job.progress: 50})
+    assert not jobs.update_job(job.id, "worker-1", {Job.progress: 60})
+
+
+def test_abandoned_job_out_of_attempts_fails(db, flaky):
+    job = jobs.enqueue(db, "flaky")
+    db.query(Job).filter(Job.id == job.id).update({Job.attempts: 1})
+    db.commit()
+    jobs.claim_job(db, "worker-1")
+    db.query(Job).filter(Job.id == job.id).update({Job.heartbeat_at: jobs.utcnow() - timedelta(seconds=120)})
+    db.commit()
+
+    assert jobs.requeue_abandoned(db, lease=60) == 1
+    job = reload(db, job.id)
+    assert (job.status, job.locked_by) == (jobs.FAILED, None)
+
+
+def test_failed_attempt_is_retried_later_then_succeeds(db, flaky):
+    flaky.append(RuntimeError("database busy"))
+    job = jobs.enqueue(db, "flaky", {"n": 1})
+
+    job = run(db)
+    assert (job.status, job.error, job.locked_by) == (jobs.QUEUED, "database busy", None)
+    assert job.run_after.replace(tzinfo=None) > jobs.utcnow().replace(tzinfo=None)
+    assert jobs.claim_job(db, "worker-1") is None
+
+    make_due(db, job.id)
+    job = run(db)
+    assert (job.status, job.error, job.progress) == (jobs.SUCCEEDED, None, 100)
+    assert job.result == {"attempt": 2, "n": 1}
+
+
+def test_last_attempt_failure_is_final(db, flaky):
+    flaky.extend([RuntimeError("first"), RuntimeError("second")])
+    job = jobs.enqueue(db, "flaky")
+    run(db)
+    make_due(db, job.id)
+    job = run(db)
+    assert (job.status, job.error, job.attempts) == (jobs.FAILED, "second", 2)
+
+
+def test_job_error_is_not_retried(db, flaky):
+    flaky.append(jobs.JobError("invalid upload"))
+    jobs.enqueue(db, "flaky")
+    job = run(db)
+    assert (job.status, job.error, job.attempts) == (jobs.FAILED, "invalid upload", 1)
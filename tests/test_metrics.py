@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.hashing import HashingOverloaded, HashingPool
+from app.metrics import instrument_engine
+
+
+def sample(name, engine_name):
+    return REGISTRY.get_sample_value(name, {"engine": engine_name})
+
+
+def test_pool_gauges_follow_the_pool_after_dispose(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=QueuePool, pool_size=2, max_overflow=1)
+    instrument_engine(engine, "dispose_test")
+    # What gunicorn's post_fork does in every worker
+    engine.dispose(close=False)
+
+    first, second = engine.connect(), engine.connect()
+    assert sample("db_pool_checked_out", "dispose_test") == 2
+    assert sample("db_pool_size", "dispose_test") == 2
+    first.execute(text("SELECT 1"))
+    first.close()
+    assert sample("db_pool_checked_out", "dispose_test") == 1
+    second.close()
+    assert sample("db_pool_checked_out", "dispose_test") == 0
+
+
+def test_pool_wait_and_timeouts_are_recorded_after_dispose(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/wait.db", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    instrument_engine(engine, "wait_test")
+    engine.dispose(close=False)
+
+    with engine.connect():
+        assert sample("db_pool_wait_seconds_count", "wait_test") == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert sample("db_pool_wait_seconds_count", "wait_test") == 2
+    assert sample("db_pool_timeouts_total", "wait_test") == 1
+
+
+def count(name):
+    return REGISTRY.get_sample_value(name) or 0
+
+
+def test_hashing_latency_queue_wait_and_rejections_are_exported():
+    before = {name: count(name) for name in ("hash_seconds_count", "hash_queue_wait_seconds_count", "hash_rejected_total")}
+    pool = HashingPool(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0)
+        assert REGISTRY.get_sample_value("hash_pending") >= 1
+        with pytest.raises(HashingOverloaded):
+            await pool.run(str, "rejected")
+        release.set()
+        assert await blocked is True
+        assert await pool.run(str.upper, "ok") == "OK"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert count("hash_seconds_count") - before["hash_seconds_count"] == 2
+    assert count("hash_queue_wait_seconds_count") - before["hash_queue_wait_seconds_count"] == 2
+    assert count("hash_rejected_total") - before["hash_rejected_total"] == 1
+    assert pool.stats()["rejected"] == 1
+
+
+def test_cancelled_hash_keeps_its_slot_until_the_thread_is_done():
+    pool = HashingPool(workers=1, max_pending=2)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        return "hashed"
+
+    async def scenario():
+        running = asyncio.create_task(pool.run(slow))
+        await asyncio.to_thread(started.wait)
+        queued = asyncio.create_task(pool.run(str, "queued"))
+        await asyncio.sleep(0)
+        assert pool.pending == 2
+
+        # Clients going away: the queued job is dropped, the running one is not
+        for task in (queued, running):
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert pool.pending == 1
+        await pool.run(str, "fits")
+        assert pool.pending == 1
+        blocked = asyncio.create_task(pool.run(release.wait))
+        with pytest.raises(HashingOverloaded):
+            await pool.run(str, "over the limit")
+
+        release.set()
+        assert await blocked is True
+        while pool.pending:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
@@ -0,0 +1,64 @@
+"""
+Query budgets of the catalog routes (see app.metrics.max_queries). The
+conftest sets SQL_QUERY_GUARD=raise, so a route that goes over its budget
+fails the request and with it the test; caches start empty in every test.
+"""
+import pytest
+from sqlalchemy.orm import lazyload
+
+from app import crud
+from app.database import SessionLocal
+from app.metrics import QueryBudgetExceeded, assert_max_queries
+from app.models import Product
+
+
+@pytest.mark.parametrize("url", [
+    "/api/categories",
+    "/api/products",
+    "/api/products?limit=100",
+    "/api/products?facets=true&min_price=50",
+    "/api/products?sort=price_desc&category_id=1",
+    "/api/search?q=reagent",
+    "/",
+    "/products",
+    "/products?category_id=2",
+])
+def test_catalog_routes_stay_within_their_budget(client, catalog, url):
+    response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_product_detail_stays_within_its_budget(client, catalog):
+    product_id = client.get("/api/products?limit=1").json()["items"][0]["id"]
+    assert client.get(f"/api/products/{product_id}").status_code == 200
+
+
+def test_eager_category_loading_keeps_a_page_at_one_query(catalog):
+    db = SessionLocal()
+    try:
+        with assert_max_queries(1):
+            products, _ = crud.get_products_page(db, limit=50, options=crud.PRODUCT_WITH_CATEGORY)
+            names = {product.category.name for product in products}
+        assert len(names) == 3
+    finally:
+        db.close()
+
+
+def test_lazy_category_access_goes_over_budget(catalog):
+    db = SessionLocal()
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_max_queries(1):
+                products = db.query(Product).options(lazyload(Product.category)).limit(50).all()
+                # One SELECT per distinct category: the N+1 the eager options prevent
+                [product.category.name for product in products]
+    finally:
+        db.close()
+
+
+def test_guard_fails_a_route_over_its_budget(client, catalog, monkeypatch):
+    from app.routers.catalog import list_products
+
+    monkeypatch.setattr(list_products, "max_queries", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/products")
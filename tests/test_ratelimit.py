@@ -0,0 +1,82 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.testclient import TestClient
+
+from app import ratelimit
+from app.ratelimit import MAX_BODY_BYTES, MemoryBackend, RateLimitMiddleware, Rule, SQLiteBackend
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """A login route behind the middleware, 3 attempts per username per minute"""
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    calls = []
+    app = FastAPI()
+
+    @app.post("/auth/login")
+    async def login(form: OAuth2PasswordRequestForm = Depends()):
+        calls.append(form.username)
+        return {"username": form.username}
+
+    rules = {("POST", "/auth/login"): (Rule("login_username", 3, 60, key="username"),)}
+    app.add_middleware(RateLimitMiddleware, backend=MemoryBackend(), rules=rules)
+    return TestClient(app), calls
+
+
+def test_urlencoded_login_is_limited_per_username_with_retry_after(limited):
+    client, calls = limited
+    statuses = [client.post("/auth/login", data={"username": "Alice", "password": "x"}).status_code for _ in range(3)]
+    assert statuses == [200, 200, 200]
+    # Usernames are compared case-insensitively
+    response = client.post("/auth/login", data={"username": "alice ", "password": "x"})
+    assert response.status_code == 429
+    # One token comes back every 60 / 3 seconds
+    assert response.headers["Retry-After"] == "20"
+    assert calls == ["Alice"] * 3
+    assert client.post("/auth/login", data={"username": "bob", "password": "x"}).status_code == 200
+
+
+def test_multipart_login_is_limited_per_username(limited):
+    client, calls = limited
+    statuses = [
+        client.post("/auth/login", files={"username": (None, "carol"), "password": (None, "x")}).status_code
+        for _ in range(4)
+    ]
+    assert statuses == [200, 200, 200, 429]
+    # The replayed body still reaches the route intact
+    assert calls == ["carol"] * 3
+
+
+def test_repeated_username_field_is_limited_as_the_route_reads_it(limited):
+    client, calls = limited
+    headers = {"content-type": "application/x-www-form-urlencoded"}
+    statuses = [
+        client.post("/auth/login", content=f"username=decoy{i}&username=victim&password=x", headers=headers).status_code
+        for i in range(5)
+    ]
+    assert statuses == [200, 200, 200, 429, 429]
+    assert calls == ["victim"] * 3
+
+    multipart = [("username", (None, "decoy")), ("username", (None, "victim")), ("password", (None, "x"))]
+    assert client.post("/auth/login", files=multipart).status_code == 429
+    assert calls == ["victim"] * 3
+
+
+def test_oversized_and_unsupported_bodies_are_refused(limited):
+    client, calls = limited
+    padded = {"username": "dave", "password": "x", "padding": "a" * MAX_BODY_BYTES}
+    assert client.post("/auth/login", data=padded).status_code == 413
+    assert client.post("/auth/login", content=b"username=dave", headers={"content-type": "text/plain"}).status_code == 415
+    assert client.post("/auth/login", json={"username": "dave", "password": "x"}).status_code == 415
+    assert calls == []
+
+
+def test_sqlite_buckets_are_shared_between_backends(tmp_path):
+    rule = Rule("shared", 2, 60, key="ip")
+    first, second = SQLiteBackend(str(tmp_path / "limits.db")), SQLiteBackend(str(tmp_path / "limits.db"))
+    assert first.hit("shared:1.2.3.4", rule)[0]
+    assert second.hit("shared:1.2.3.4", rule)[0]
+    allowed, retry_after = first.hit("shared:1.2.3.4", rule)
+    assert not allowed
+    assert 29 < retry_after <= 30